@@ -1,3 +1,4 @@
+import bisect
 import math
 from enum import Enum
 
@@ -53,20 +54,20 @@ class CurveType(Enum):
 class Curve:
     # args = list of [target_value, time_value [0.0,infinity], curve_type, curve_power (used in exponential and root, default is 2)]
     def __init__(self, curve):
-        self.current_index = 0
         self.curve = curve
+        self.times = [keyframe[1] for keyframe in curve]
 
+    # Stateless, so frames can be evaluated in any order or in separate processes
     def interpolate(self, time_value):
-        # Ensure current_index points to the last element with a lower time_value or the last element in curve
-        while self.current_index+1 < len(self.curve) and self.curve[self.current_index + 1][1] <= time_value:
-            self.current_index += 1
+        # Index of the last keyframe with a lower time_value, or the first keyframe
+        index = max(0, bisect.bisect_right(self.times, time_value) - 1)
 
-        if self.current_index+1 == len(self.curve):
-            return self.curve[self.current_index][0]
+        if index+1 == len(self.curve):
+            return self.curve[index][0]
 
         # Get interpolation_value between current and next keyframe
-        time_value -= self.curve[self.current_index][1]
-        interpolation_value = time_value / (self.curve[self.current_index + 1][1] - self.curve[self.current_index][1])
-        interpolation_value = CurveType.apply_curve(interpolation_value, self.curve[self.current_index][2], self.curve[self.current_index][3])
+        time_value -= self.curve[index][1]
+        interpolation_value = time_value / (self.curve[index + 1][1] - self.curve[index][1])
+        interpolation_value = CurveType.apply_curve(interpolation_value, self.curve[index][2], self.curve[index][3])
 
-        return (1.0 - interpolation_value) * self.curve[self.current_index][0] + interpolation_value * self.curve[self.current_index + 1][0]
+        return (1.0 - interpolation_value) * self.curve[index][0] + interpolation_value * self.curve[index + 1][0]
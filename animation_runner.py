@@ -1,44 +1,175 @@
 import os
-import glob
 import contextlib
-from PIL import Image
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from gif_writer import GifWriter
+from frame_store import FrameStore
+from screen import to_image
+from transform import Transform
+import animation_curve as curve
+import palette
 
+# Frames rendered first to build the gif's palette from, spread evenly over the animation
+PALETTE_SAMPLES = 8
 
-def run_animation(renderer, shading, bg_color, ambient_light, fps, time):
+
+# workers: with more than one, frames are rendered in that many processes, each with its own copy of the scene
+# output: "gif" for an image.gif, or "frames" for raw frames in a memory-mapped frames.npy, see frame_store.
+# depth: with "frames", also store every frame's depth in frames_depth.npy
+# resume: with "frames", keep the frames an interrupted render of the same scene and settings already stored
+# and only render the missing ones. Otherwise the store is started over.
+def run_animation(renderer, shading, bg_color, ambient_light, fps, time, workers=1, output="gif", depth=False,
+                  resume=False):
+    if output not in ("gif", "frames"):
+        raise ValueError("Output is neither gif nor frames!")
     frames = int(fps * time)
-    filenamelist = [0] * frames
+    if frames < 1:
+        raise ValueError("Animation is shorter than a frame!")
 
     path = "animations/"
     if not os.path.exists(path):
         os.mkdir(path)
 
-    for i in range(frames):
-        frame_time = i / fps
-        print("Frame: " + str(i) + " at time: " + str(frame_time))
-        frame = renderer.render(shading, bg_color, ambient_light, frame_time)
-
-        filenamelist[i] = path + "frame_" + f"{i:03}" + ".png"
-        renderer.screen.save_screen(filenamelist[i])
-
+    if output == "frames":
+        store = FrameStore(path + "frames", frames, renderer.screen.width, renderer.screen.height, depth,
+                           _scene_key(renderer, shading, bg_color, ambient_light, fps), resume)
+        _store_frames(renderer, shading, bg_color, ambient_light, fps, store, workers)
+        print("\nFrames saved to: " + os.getcwd() + "\\" + (path + "frames.npy").replace("/", "\\"))
+        return
 
-    # filepaths
-    fp_in = path + "frame_*.png"
     fp_out = path + "image.gif"
 
     dur = max(int(1000/fps), 1)
 
-    # use exit stack to automatically close opened images
-    with contextlib.ExitStack() as stack:
+    with _worker_pool(renderer, workers) as pool:
+        # One palette for every frame, so colors don't flicker between frames. The sampled frames are kept
+        # until the gif gets to them.
+        samples = np.unique(np.linspace(0, frames - 1, min(PALETTE_SAMPLES, frames)).astype(int))
+        sampled = {i: frame.copy() for i, (frame, _) in
+                   zip(samples, _render_frames(pool, workers, renderer, shading, bg_color, ambient_light, fps, samples))}
+        # One color is left for the transparency of the gif's delta frames
+        colors = palette.build_palette([to_image(frame) for frame in sampled.values()], colors=255)
+        lut = palette.color_lut(colors)
 
-        imgs = (stack.enter_context(Image.open(f))
-                for f in sorted(glob.glob(fp_in)))
+        # The other frames go straight from the render buffer into the gif as they are rendered,
+        # mapped to the palette by the workers rendering them
+        rendered = _render_frames(pool, workers, renderer, shading, bg_color, ambient_light, fps,
+                                  [i for i in range(frames) if i not in sampled], lut)
+        with GifWriter(fp_out, dur, loop=0, palette=colors) as gif:
+            for i in range(frames):
+                if i in sampled:
+                    frame = sampled.pop(i)
+                    image = palette.quantize(to_image(frame), lut)
+                else:
+                    frame, image = next(rendered)
+                frame_time = i / fps
+                print("Frame: " + str(i) + " at time: " + str(frame_time))
+                renderer.screen.draw(frame)
+                gif.write(image)
 
-        img = next(imgs)
+    print("\nAnimation saved to: " + os.getcwd() + "\\" + fp_out.replace("/", "\\"))
 
-        img.save(fp=fp_out, format='GIF', append_images=imgs,
-                 save_all=True, duration=dur, loop=0)
 
-    for frame in filenamelist:
-        os.remove(frame)
+# A process pool of workers, each with its own copy of the renderer and store, or None for a single process
+def _worker_pool(renderer, workers, store=None):
+    if workers <= 1:
+        return contextlib.nullcontext()
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(renderer, store))
 
-    print("\nAnimation saved to: " + os.getcwd() + "\\" + fp_out.replace("/", "\\"))
+
+# Yields (frame, palette indices) of the frames at indices in order, the indices only with a palette.color_lut.
+# Frames only depend on their time, so in a pool they are rendered out of order. At most two frames per worker
+# are in flight, so finished frames don't pile up in memory ahead of the consumer.
+def _render_frames(pool, workers, renderer, shading, bg_color, ambient_light, fps, indices, lut=None):
+    jobs = ((shading, bg_color, ambient_light, i / fps, lut) for i in indices)
+    if pool is None:
+        for job in jobs:
+            yield _render_frame(job, renderer)
+        return
+
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(_render_frame, job))
+        if len(pending) >= 2 * workers:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# Renders the frames missing from a FrameStore into it. With workers > 1 every worker writes its frames
+# into the store itself, they aren't sent back or drawn to the screen.
+def _store_frames(renderer, shading, bg_color, ambient_light, fps, store, workers):
+    missing = store.missing()
+    if workers <= 1:
+        for i in missing:
+            print("Frame: " + str(i) + " at time: " + str(i / fps))
+            frame = renderer.render_frame(shading, bg_color, ambient_light, i / fps)
+            renderer.screen.draw(frame)
+            store.write(i, frame, renderer.depth_buffer() if store.depth is not None else None)
+    else:
+        jobs = [(i, (shading, bg_color, ambient_light, i / fps)) for i in missing]
+        with _worker_pool(renderer, workers, store) as pool:
+            for i in pool.map(_store_frame, jobs):
+                print("Frame: " + str(i) + " at time: " + str(i / fps))
+    store.flush()
+
+
+# Hash of everything the frames depend on: the render settings, the camera, the light and every mesh's
+# geometry, material and transform. A store written with another key isn't resumed.
+def _scene_key(renderer, shading, bg_color, ambient_light, fps):
+    digest = hashlib.sha1()
+    camera, light = renderer.camera, renderer.light
+    _hash(digest, shading.name, np.asarray(bg_color), np.asarray(ambient_light), fps, renderer.deferred,
+          renderer.occlusion_culling, renderer.frustum_culling, renderer.scanline, renderer.jit,
+          renderer.buffers.color_dtype.str, renderer.buffers.depth_dtype.str, renderer.lod_faces_per_pixel,
+          type(camera).__name__, camera.transform, camera.ortho_transform, getattr(camera, "persp_transform", None),
+          light.transform, light.intensity, light.color)
+    for mesh in renderer.meshs:
+        _hash(digest, mesh.transform, mesh.diffuse_color, mesh.specular_color, mesh.ka, mesh.kd, mesh.ks, mesh.ke,
+              mesh.geometry.verts, mesh.geometry.faces, len(mesh.geometry.lods))
+        for level in mesh.geometry.lods:
+            _hash(digest, level.verts, level.faces)
+    return digest.hexdigest()
+
+
+def _hash(digest, *values):
+    for value in values:
+        if isinstance(value, Transform):
+            _hash(digest, value.x_pos, value.y_pos, value.z_pos, value.x_rot, value.y_rot, value.z_rot)
+        elif isinstance(value, curve.Curve):
+            digest.update(repr(value.curve).encode())
+        elif isinstance(value, np.ndarray):
+            digest.update(repr((value.dtype.str, value.shape)).encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(repr(value).encode())
+
+
+_worker_renderer = None
+_worker_store = None
+
+
+def _init_worker(renderer, store=None):
+    global _worker_renderer, _worker_store
+    # The frames are already spread over the cores, so each worker renders its frames in a single process
+    renderer.tiles = None
+    _worker_renderer = renderer
+    _worker_store = store
+
+
+# Renders a frame and maps it to the palette of its lut, if any. Runs in a worker unless given a renderer.
+def _render_frame(job, renderer=None):
+    renderer = _worker_renderer if renderer is None else renderer
+    *args, lut = job
+    frame = renderer.render_frame(*args)
+    return frame, None if lut is None else palette.quantize(to_image(frame), lut)
+
+
+def _store_frame(job):
+    i, args = job
+    frame = _worker_renderer.render_frame(*args)
+    _worker_store.write(i, frame, _worker_renderer.depth_buffer() if _worker_store.depth is not None else None)
+    _worker_store.flush()
+    return i
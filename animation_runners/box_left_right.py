@@ -1,5 +1,5 @@
 import numpy as np
-from screen import Screen
+from screen import create_screen
 from camera import PerspectiveCamera,OrthoCamera
 from mesh import Mesh
 from renderer import Renderer, RenderAlgorithm
@@ -9,7 +9,7 @@ import animation_runner as animate
 
 
 if __name__ == '__main__':
-    screen = Screen(500,500)
+    screen = create_screen(500, 500)
 
     camera = PerspectiveCamera(-1.0, 1.0, -1.0, 1.0, 1.0, 10)
     camera.transform.set_position(0, -2.5, 0)
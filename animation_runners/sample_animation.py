@@ -1,4 +1,4 @@
-from screen import Screen
+from screen import create_screen
 from camera import PerspectiveCamera, OrthoCamera
 from light import PointLight
 from mesh import Mesh
@@ -9,7 +9,7 @@ import animation_runner as animate
 
 if __name__ == '__main__':
     # Defines a 500 by 500 canvas for the image
-    screen = Screen(500, 500)
+    screen = create_screen(500, 500)
 
     # A camera can be either an OrthoCamera (orthographic) or PerspectiveCamera, both use the same arguments
     # Defines a camera with the bounding box of (left, right, bottom, top, near, far)
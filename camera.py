@@ -30,6 +30,15 @@ class OrthoCamera:
         p2[:3] = self.transform.apply_inverse_to_point(p, self.time)
         return np.matmul(self.ortho_transform, p2)[:3]
 
+    # World space to screen space as a single 4x4 matrix
+    def view_projection_matrix(self):
+        return np.matmul(self.ortho_transform, self.transform.inverse_matrix(self.time))
+
+    # Homogeneous (N, 4) clip space points, before the divide by w.
+    # Inside the view volume -w <= x, y, z <= w, where y = -w is the near plane.
+    def clip_points(self, points, model_matrix=None):
+        return _clip(self.view_projection_matrix(), points, model_matrix)
+
     def project_inverse_point(self, p):
         p2 = np.matmul(self._ortho_inverse_matrix(), np.array([p[0],p[1],p[2],1.0]))[:3]
         return self.transform.apply_to_point(p2, self.time).flatten()
@@ -84,6 +93,16 @@ class PerspectiveCamera:
         p2 = np.matmul(self.ortho_transform, p2)
         return p2[:3]
 
+    # World space to clip space as a single 4x4 matrix, divide by w to get screen space
+    def view_projection_matrix(self):
+        proj = np.matmul(self.ortho_transform, self.persp_transform)
+        return np.matmul(proj, self.transform.inverse_matrix(self.time))
+
+    # Homogeneous (N, 4) clip space points, before the divide by w.
+    # Inside the view volume -w <= x, y, z <= w, where y = -w is the near plane.
+    def clip_points(self, points, model_matrix=None):
+        return _clip(self.view_projection_matrix(), points, model_matrix)
+
     def project_inverse_point(self, p):
         p1 = np.matmul(self._ortho_inverse_matrix(), np.append(p,1.0))
         yc = -self.persp_transform[1, 3] / (self.persp_transform[1, 1] - p1[1])
@@ -109,3 +128,9 @@ class PerspectiveCamera:
         ret[3,1] = 1/self.persp_transform[1, 3]
         ret[3,3] = -(self.persp_transform[1, 1] / self.persp_transform[1, 3])
         return ret
+
+
+def _clip(view_projection, points, model_matrix=None):
+    mvp = view_projection if model_matrix is None else np.matmul(view_projection, model_matrix)
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    return np.matmul(points, mvp[:, :3].T) + mvp[:, 3]
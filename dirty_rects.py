@@ -0,0 +1,44 @@
+import numpy as np
+from rasterizer import bounding_boxes
+
+
+# Display bounding boxes (x0, x1, y0, y1) of face_ids[i] of every TransformedMesh frames[i],
+# four (n,) int arrays per frame, see rasterizer.bounding_boxes
+def face_boxes(frames, face_ids, width, height):
+    boxes = []
+    for frame, ids in zip(frames, face_ids):
+        if len(ids) == 0:
+            boxes.append(tuple(np.zeros(0, dtype=int) for _ in range(4)))
+            continue
+        boxes.append(bounding_boxes(*frame.screen_bounds(ids), width, height))
+    return boxes
+
+
+# The display rect (x0, x1, y0, y1) around the face boxes of every frame that has any faces
+def mesh_rects(boxes):
+    return [(int(x0.min()), int(x1.max()), int(y0.min()), int(y1.max())) for x0, x1, y0, y1 in boxes if len(x0)]
+
+
+# Merges overlapping rects into their bounding rect until none overlap, so no pixel is drawn twice
+def merge(rects):
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] <= b[1] and b[0] <= a[1] and a[2] <= b[3] and b[2] <= a[3]:
+                    rects[i] = (min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3]))
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+
+# face_ids[i] reduced to the faces whose box overlaps rect, in the same order
+def faces_in_rect(face_ids, boxes, rect):
+    return [np.asarray(ids, dtype=int)[(x0 <= rect[1]) & (rect[0] <= x1) & (y0 <= rect[3]) & (rect[2] <= y1)]
+            for ids, (x0, x1, y0, y1) in zip(face_ids, boxes)]
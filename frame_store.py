@@ -0,0 +1,97 @@
+import os
+import numpy as np
+from numpy.lib.format import open_memmap
+from screen import to_image
+
+
+# Raw frames of an animation in memory-mapped .npy files, for post-processing instead of a gif:
+# <path>.npy holds the (frames, height, width, 3) uint8 colors, top row first like the gif,
+# <path>_depth.npy the (frames, height, width) float32 screen space depth if depth is set, 2.0 where nothing was drawn,
+# <path>_done.npy which frames have been written, and <path>_key.txt the key of the scene and settings they show.
+# The files are allocated up front and frames are written by index, so processes can fill their own slots.
+# With resume, a store at path with the same key, size and depth keeps the frames already written, to finish an
+# interrupted render. Otherwise, or if any file doesn't fit, every file is allocated again with no frame written.
+class FrameStore:
+    def __init__(self, path, frames, width, height, depth=False, key="", resume=False):
+        self.path = path
+        files = [(path + ".npy", (frames, height, width, 3), np.uint8),
+                 (path + "_depth.npy", (frames, height, width), np.float32),
+                 (path + "_done.npy", (frames,), np.bool_)]
+        if not depth:
+            del files[1]
+            # A depth file of an earlier render would no longer match the frames
+            _remove(path + "_depth.npy")
+
+        arrays = None
+        if resume and _read_key(path) == key:
+            arrays = [_existing(*file) for file in files]
+        if arrays is None or any(array is None for array in arrays):
+            arrays = None
+            # The key is written last, an interrupted allocation leaves no store to resume
+            _remove(path + "_key.txt")
+            arrays = [open_memmap(file_path, mode='w+', dtype=dtype, shape=shape) for file_path, shape, dtype in files]
+            with open(path + "_key.txt", 'w') as file:
+                file.write(key)
+        self.color = arrays[0]
+        self.depth = arrays[1] if depth else None
+        self.done = arrays[-1]
+
+    # Indices of the frames not written yet
+    def missing(self):
+        return np.flatnonzero(~self.done)
+
+    # Stores the (width, height, 3) frame at index, with its (width, height) z-buffer if the store has depth
+    def write(self, index, frame, depth=None):
+        self.color[index] = to_image(frame)
+        if self.depth is not None:
+            self.depth[index] = np.fliplr(depth).T
+        # Only marked once the data is in place, an interrupted write is redone on resume
+        self.done[index] = True
+
+    def flush(self):
+        for array in (self.color, self.depth, self.done):
+            if array is not None:
+                array.flush()
+
+    # The files are opened again by a copy in another process, the mapped arrays aren't pickled
+    def __getstate__(self):
+        return {'path': self.path, 'depth': self.depth is not None}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self.color = open_memmap(self.path + ".npy", mode='r+')
+        self.depth = open_memmap(self.path + "_depth.npy", mode='r+') if state['depth'] else None
+        self.done = open_memmap(self.path + "_done.npy", mode='r+')
+
+
+# Maps the (color, depth, done) arrays of a store at path read-only, depth is None if it wasn't stored.
+# Frames are only read from disk when accessed.
+def load(path):
+    depth = path + "_depth.npy"
+    return (np.load(path + ".npy", mmap_mode='r'),
+            np.load(depth, mmap_mode='r') if os.path.exists(depth) else None,
+            np.load(path + "_done.npy", mmap_mode='r'))
+
+
+# Maps an existing .npy file of this shape and dtype for writing, or returns None if there is none
+def _existing(file_path, shape, dtype):
+    if not os.path.exists(file_path):
+        return None
+    array = open_memmap(file_path, mode='r+')
+    if array.shape == shape and array.dtype == dtype:
+        return array
+    return None
+
+
+# The key of the store at path, or None if it has none
+def _read_key(path):
+    try:
+        with open(path + "_key.txt") as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def _remove(file_path):
+    if os.path.exists(file_path):
+        os.remove(file_path)
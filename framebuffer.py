@@ -0,0 +1,48 @@
+import numpy as np
+
+
+# Color and depth buffers owned by a Renderer and reused from frame to frame.
+# One pair is kept per (width, height), clear() resets it in place instead of allocating a new frame.
+# color_dtype and depth_dtype set the precision: uint8 colors are all a display needs.
+# float64 depth keeps the z-test and DEPTH shading exact, float32 halves the z-buffer but rounds depth, which
+# flips some pixels where faces meet and shifts DEPTH gray levels in the deferred and tiled paths.
+class FrameBuffers:
+    def __init__(self, color_dtype=np.uint8, depth_dtype=np.float64):
+        self.color_dtype = np.dtype(color_dtype)
+        self.depth_dtype = np.dtype(depth_dtype)
+        self._buffers = {}
+
+    # Returns the (width, height, 3) color buffer filled with bg_color and the (width, height) z-buffer
+    # cleared to 2.0, behind every face. Both are overwritten by the next clear of the same size.
+    # layer: a (color, depth) pair to start from instead, e.g. already rendered static geometry
+    def clear(self, width, height, bg_color, layer=None):
+        if (width, height) not in self._buffers:
+            self._buffers[(width, height)] = (np.empty((width, height, 3), dtype=self.color_dtype),
+                                              np.empty((width, height), dtype=self.depth_dtype))
+        color, depth = self._buffers[(width, height)]
+        if layer is None:
+            color[...] = bg_color
+            depth.fill(2.0)
+        else:
+            color[...] = layer[0]
+            depth[...] = layer[1]
+        return color, depth
+
+    # Returns the (color, depth) buffers of this size as the last frame left them, or None if there are none
+    def retained(self, width, height):
+        return self._buffers.get((width, height))
+
+    # Drops every buffer
+    def release(self):
+        self._buffers.clear()
+
+    # Buffers aren't sent to other processes, a copy allocates its own when it first renders
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_buffers'] = {}
+        return state
+
+
+# Shaded colors as stored in a color buffer, clipped to the displayable [0, 255]
+def to_color(shaded):
+    return np.clip(shaded, 0, 255)
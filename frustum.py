@@ -0,0 +1,68 @@
+import numpy as np
+
+# Column of the near plane in plane_distances
+NEAR = 1
+
+
+# Signed distances of (N, 4) clip space points to the six planes of the view volume, returns (N, 6).
+# Columns are the -x, near, -z, +x, far and +z planes, a point is inside a plane when its distance is >= 0.
+def plane_distances(clip):
+    w = clip[:, 3:4]
+    return np.concatenate((w + clip[:, :3], w - clip[:, :3]), axis=1)
+
+
+# Clip space to screen space, points on the camera plane (w = 0) go to infinity
+def to_screen(clip):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return clip[:, :3] / clip[:, 3:4]
+
+
+# True if a mesh's bounds ((min x, y, z), (max x, y, z)), moved by model_matrix, are entirely outside
+# the camera's view volume. Meshes without bounds are never outside.
+def bounds_outside(bounds, model_matrix, camera):
+    if len(bounds) != 2:
+        return False
+    distances = plane_distances(camera.clip_points(bounds_corners(bounds), model_matrix))
+    return bool((distances < 0).all(axis=0).any())
+
+
+# The (8, 3) corners of bounds ((min x, y, z), (max x, y, z))
+def bounds_corners(bounds):
+    low, high = bounds
+    return np.array([[x, y, z] for x in (low[0], high[0]) for y in (low[1], high[1]) for z in (low[2], high[2])],
+                    dtype=float)
+
+
+# Mask of the (F, 3) faces with every vertex outside the same plane, distances are the vertices' plane_distances
+def faces_outside(distances, faces):
+    return (distances[faces] < 0).all(axis=1).any(axis=1)
+
+
+# Clips faces_ids of the (F, 3) faces against the near plane, clip_verts are the (N, 4) clip space vertices.
+# Returns {face_id: [(verts, bary), ...]} with the screen space (3, 3) verts of every triangle left in front of
+# the plane, and the (3, 3) bary matrix mapping barycentric coordinates in that triangle to ones in the face.
+def clip_near(clip_verts, faces, face_ids):
+    clipped = {}
+    for face_id in face_ids:
+        clip = clip_verts[faces[face_id]]
+        distance = clip[:, 3] + clip[:, NEAR]
+        bary = np.identity(3)
+
+        # Sutherland-Hodgman against the one plane, carrying the barycentric coordinates of every vertex
+        polygon = []
+        for a in range(3):
+            b = (a + 1) % 3
+            if distance[a] >= 0:
+                polygon.append((clip[a], bary[a]))
+            if (distance[a] >= 0) != (distance[b] >= 0):
+                t = distance[a] / (distance[a] - distance[b])
+                polygon.append((clip[a] + t * (clip[b] - clip[a]), bary[a] + t * (bary[b] - bary[a])))
+
+        # Fan triangulation keeps the winding of the face
+        triangles = []
+        for i in range(1, len(polygon) - 1):
+            corners = (polygon[0], polygon[i], polygon[i + 1])
+            verts = to_screen(np.array([corner[0] for corner in corners]))
+            triangles.append((verts, np.array([corner[1] for corner in corners])))
+        clipped[int(face_id)] = triangles
+    return clipped
@@ -0,0 +1,61 @@
+import numpy as np
+from rasterizer import rasterize
+import raster_jit
+from framebuffer import to_color
+
+
+# Per-pixel surface data of the nearest face, filled by the geometry pass of deferred shading.
+# A mesh_id of -1 marks a pixel no face covers.
+# The buffer covers the display rect starting at (x0, y0), all coordinates passed in and out are display
+# coordinates. depth is the z-buffer, indexed with display coordinates, and can be an existing one.
+class GBuffer:
+    def __init__(self, width, height, x0=0, y0=0, depth=None):
+        self.x0 = x0
+        self.y0 = y0
+        self.depth = np.full((x0 + width, y0 + height), 2.0) if depth is None else depth
+        self.mesh_id = np.full((width, height), -1, dtype=np.int32)
+        self.face_id = np.full((width, height), -1, dtype=np.int32)
+        self.bc = np.zeros((width, height, 3))
+
+    # Display rect (x0, x1, y0, y1) covered by the buffer, both ends inclusive
+    def rect(self):
+        return self.x0, self.x0 + self.mesh_id.shape[0] - 1, self.y0, self.y0 + self.mesh_id.shape[1] - 1
+
+    # Geometry pass: rasterizes the (mesh_id, face_ids) runs of draw_list, see rasterizer.rasterize.
+    # Without depth_tested every covered pixel is written, in draw order.
+    # jit: fill the buffer with the compiled kernel of raster_jit when Numba is installed, hiz and scanline are
+    # only used by the NumPy core
+    def rasterize(self, frames, draw_list, screen_width, screen_height, depth_tested=True, hiz=None,
+                  scanline=False, jit=False):
+        if jit and raster_jit.available:
+            raster_jit.rasterize(self, frames, draw_list, screen_width, screen_height, depth_tested)
+            return
+        rasterize(self, self.depth, frames, draw_list, screen_width, screen_height, depth_tested, self.rect(), hiz,
+                  scanline)
+
+    # Rasterization target, see rasterizer.rasterize
+    def write(self, mesh_id, frame, face_id, xs, ys, bc, depth):
+        xs = xs - self.x0
+        ys = ys - self.y0
+        self.mesh_id[xs, ys] = mesh_id
+        self.face_id[xs, ys] = face_id
+        self.bc[xs, ys] = bc
+
+    # Shading pass: colors every covered pixel of render with shader (see shading.Shader), one mesh at a time
+    def resolve(self, render, frames, shader):
+        for mesh_id, frame in enumerate(frames):
+            xs, ys, face_ids, bc, depth = self.pixels(mesh_id)
+            if len(xs) == 0:
+                continue
+            render[xs, ys] = to_color(shader.shade(mesh_id, frame, face_ids, bc, depth))
+
+    # Returns (xs, ys, face_ids, bc, depth) of every pixel showing the mesh, or any mesh if mesh_id is None
+    def pixels(self, mesh_id=None):
+        if mesh_id is None:
+            xs, ys = np.nonzero(self.mesh_id >= 0)
+        else:
+            xs, ys = np.nonzero(self.mesh_id == mesh_id)
+        face_ids, bc = self.face_id[xs, ys], self.bc[xs, ys]
+        xs = xs + self.x0
+        ys = ys + self.y0
+        return xs, ys, face_ids, bc, self.depth[xs, ys]
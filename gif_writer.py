@@ -0,0 +1,82 @@
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+
+# Writes an animated GIF one frame at a time, so frames can be streamed in as they are rendered.
+# Only the frame being written is held in memory.
+# Without a palette each frame gets its own adaptive palette, the first one's is the global color table.
+# With a palette, every frame is given as indices into it and it is the only color table, see palette.py.
+# With delta as well, every frame after the first only stores the rectangle that changed since the frame before,
+# drawn over it. Unchanged pixels inside the rectangle are transparent if the palette leaves an index free for it.
+class GifWriter:
+    # duration: display time of every frame in milliseconds, loop: number of repeats, 0 loops forever
+    # palette: (n, 3) uint8 colors shared by every frame, at most 256, at most 255 to leave room for transparency
+    def __init__(self, file_path, duration, loop=0, palette=None, delta=True):
+        if palette is not None and not 0 < len(palette) <= 256:
+            raise ValueError("Palette is empty or has more than 256 colors!")
+        self.duration = duration
+        self.loop = loop
+        self.palette = None if palette is None else np.asarray(palette, dtype=np.uint8)
+        self.delta = delta and palette is not None
+        self.frames = 0
+        self._previous = None
+        self._transparent = None
+        if self.delta and len(self.palette) < 256:
+            self._transparent = len(self.palette)
+            self.palette = np.concatenate([self.palette, np.zeros((1, 3), dtype=np.uint8)])
+        self._file = open(file_path, 'wb')
+
+    # Appends a (height, width, 3) uint8 image array, or (height, width) uint8 palette indices with a palette
+    def write(self, image):
+        params = {'duration': self.duration}
+        offset = (0, 0)
+        if self.palette is None:
+            frame = Image.fromarray(image).convert("P", palette=Image.Palette.ADAPTIVE)
+        else:
+            indices = image
+            if self.delta:
+                # Every frame stays on screen as the background of the next one
+                params['disposal'] = 1
+                if self._previous is not None:
+                    indices, offset = self._changes(image)
+                    if self._transparent is not None:
+                        params['transparency'] = self._transparent
+                self._previous = np.array(image, dtype=np.uint8)
+            frame = Image.fromarray(indices, "P")
+            frame.putpalette(self.palette.tobytes())
+        if self.frames == 0:
+            header, _ = GifImagePlugin.getheader(frame, None, {'duration': self.duration, 'loop': self.loop})
+            self._file.write(b"".join(header))
+        elif self.palette is None:
+            params['include_color_table'] = True
+        for data in GifImagePlugin.getdata(frame, offset, **params):
+            self._file.write(data)
+        self.frames += 1
+
+    # Returns the indices of the rectangle of image that differs from the previous frame, with the unchanged
+    # pixels in it transparent, and the rectangle's (x, y) offset. An unchanged frame keeps a single pixel.
+    def _changes(self, image):
+        changed = image != self._previous
+        rows = np.flatnonzero(changed.any(axis=1))
+        columns = np.flatnonzero(changed.any(axis=0))
+        if len(rows) == 0:
+            y0 = y1 = x0 = x1 = 0
+        else:
+            y0, y1, x0, x1 = rows[0], rows[-1], columns[0], columns[-1]
+        indices = np.array(image[y0:y1 + 1, x0:x1 + 1], dtype=np.uint8)
+        if self._transparent is not None:
+            indices[~changed[y0:y1 + 1, x0:x1 + 1]] = self._transparent
+        return indices, (int(x0), int(y0))
+
+    # Ends the GIF and closes the file
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.write(b";")
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
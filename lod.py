@@ -0,0 +1,116 @@
+import heapq
+import numpy as np
+from frustum import bounds_corners
+from shading import normalize_rows
+import welding
+
+
+# Edge-collapse simplification of a triangle mesh down to about target_faces faces.
+# The shortest edge is collapsed into its midpoint first. Collapses that would make the surface non-manifold
+# or flip a neighbouring face are skipped, so the result can keep more faces than asked for.
+# Returns the new (N, 3) verts and (F, 3) faces, faces keep their winding.
+def simplify(verts, faces, target_faces):
+    verts = np.array(verts, dtype=float)
+    faces = np.array(faces, dtype=int).reshape(-1, 3)
+    alive = np.ones(len(faces), dtype=bool)
+    face_count = len(faces)
+
+    vert_faces = [set() for _ in range(len(verts))]
+    for face_id, face in enumerate(faces):
+        for v in face:
+            vert_faces[v].add(face_id)
+    version = np.zeros(len(verts), dtype=int)  # bumped when a vertex moves, marks its queued edges stale
+
+    queue = []
+    for a, b in {(min(a, b), max(a, b)) for face in faces for a, b in zip(face, np.roll(face, 1))}:
+        heapq.heappush(queue, (_length(verts, a, b), a, b, 0, 0))
+
+    while face_count > target_faces and queue:
+        length, a, b, version_a, version_b = heapq.heappop(queue)
+        if version[a] != version_a or version[b] != version_b or not vert_faces[a] or not vert_faces[b]:
+            continue
+        shared = vert_faces[a] & vert_faces[b]
+        if not shared or not _manifold_collapse(faces, vert_faces, a, b, shared):
+            continue
+
+        position = (verts[a] + verts[b]) / 2
+        around = (vert_faces[a] | vert_faces[b]) - shared
+        if _flips(verts, faces, around, a, b, position):
+            continue
+
+        # b merges into a, the faces on the edge disappear
+        verts[a] = position
+        for face_id in shared:
+            alive[face_id] = False
+            for v in faces[face_id]:
+                vert_faces[v].discard(face_id)
+        face_count -= len(shared)
+        for face_id in vert_faces[b]:
+            faces[face_id][faces[face_id] == b] = a
+        vert_faces[a] |= vert_faces[b]
+        vert_faces[b] = set()
+        version[a] += 1
+
+        for face_id in vert_faces[a]:
+            for v in faces[face_id]:
+                if v != a:
+                    heapq.heappush(queue, (_length(verts, a, v), min(a, v), max(a, v),
+                                           version[min(a, v)], version[max(a, v)]))
+
+    # Drop unused verts and renumber the remaining faces
+    faces = faces[alive]
+    used, faces = np.unique(faces, return_inverse=True)
+    return verts[used], faces.reshape(-1, 3)
+
+
+# Returns (face normals, vertex normals) of a mesh, both normalized.
+# Vertex normals are weighted by face area like those of the full mesh, see welding.vertex_normals.
+def normals(verts, faces):
+    face_verts = verts[faces]
+    area_normals = np.cross(face_verts[:, 1] - face_verts[:, 0], face_verts[:, 2] - face_verts[:, 0])
+    return normalize_rows(area_normals), welding.vertex_normals(faces, area_normals, len(verts))
+
+
+# Returns the level of detail of mesh to render: the most detailed of mesh and mesh.lods with at most
+# faces_per_pixel faces per display pixel its bounds cover on screen.
+# Meshes reaching behind the camera are rendered at full detail.
+def select_level(mesh, model_matrix, camera, width, height, faces_per_pixel):
+    if len(mesh.lods) == 0 or len(mesh.bounds) != 2:
+        return mesh
+    clip = camera.clip_points(bounds_corners(mesh.bounds), model_matrix)
+    if (clip[:, 3] <= 0).any():
+        return mesh
+
+    # Display area of the screen space bounds, limited to the screen
+    screen = np.clip(clip[:, :3] / clip[:, 3:4], -1.0, 1.0)
+    area = np.ptp(screen[:, 0]) * width / 2 * np.ptp(screen[:, 2]) * height / 2
+    for level in [mesh] + list(mesh.lods):
+        if len(level.faces) <= area * faces_per_pixel:
+            return level
+    return mesh.lods[-1]
+
+
+# The link condition: a and b may only share the verts opposite them in their shared faces
+def _manifold_collapse(faces, vert_faces, a, b, shared):
+    neighbours_a = {v for face_id in vert_faces[a] for v in faces[face_id]} - {a, b}
+    neighbours_b = {v for face_id in vert_faces[b] for v in faces[face_id]} - {a, b}
+    opposite = {v for face_id in shared for v in faces[face_id]} - {a, b}
+    return neighbours_a & neighbours_b == opposite
+
+
+# True if moving a and b to position turns any of the faces around them over
+def _flips(verts, faces, around, a, b, position):
+    for face_id in around:
+        face = faces[face_id]
+        before = verts[face]
+        after = before.copy()
+        after[(face == a) | (face == b)] = position
+        normal_before = np.cross(before[1] - before[0], before[2] - before[0])
+        normal_after = np.cross(after[1] - after[0], after[2] - after[0])
+        if np.dot(normal_before, normal_after) <= 0:
+            return True
+    return False
+
+
+def _length(verts, a, b):
+    return float(np.linalg.norm(verts[a] - verts[b]))
@@ -1,17 +1,117 @@
+import os
+import weakref
 import numpy as np
 from transform import Transform
 import stl
+import lod
+import welding
+import stl_stream
+import mesh_cache
+
+
+# A mesh's shape: vertices, faces, normals and bounds, with its decimated levels of detail.
+# One Geometry can be shared by many Meshs, each drawing it with its own transform and material.
+class Geometry:
+    def __init__(self, verts=(), faces=(), normals=(), vertex_normals=(), bounds=()):
+        self.verts = np.asarray(verts, dtype=float).reshape(-1, 3)
+        self.faces = np.asarray(faces, dtype=int).reshape(-1, 3)
+        self.normals = np.asarray(normals)
+        self.vertex_normals = np.asarray(vertex_normals, dtype=float).reshape(-1, 3)
+        self.bounds = bounds
+        # Decimated versions, each with about half the faces of the one before, see build_lods
+        self.lods = []
+
+    # Loads and welds an stl file, see Mesh.from_stl for the arguments.
+    # With cache, a file already loaded with the same settings returns the same Geometry while it is in use.
+    @staticmethod
+    def from_stl(stl_path, lod_levels=0, weld_tolerance=0.0, cache=True):
+        stat = os.stat(stl_path)
+        loaded_key = (os.path.realpath(stl_path), stat.st_mtime_ns, stat.st_size, weld_tolerance, lod_levels)
+        geometry = _loaded.get(loaded_key) if cache else None
+        if geometry is not None:
+            return geometry
+
+        cache_key = mesh_cache.key(stl_path, (weld_tolerance, lod_levels)) if cache else None
+        cached = mesh_cache.load(cache_key, _ARRAYS)
+        if cached is not None:
+            geometry = Geometry._from_arrays(cached)
+        else:
+            geometry = Geometry._read_stl(stl_path, weld_tolerance)
+            geometry.build_lods(lod_levels)
+            mesh_cache.store(cache_key, geometry._arrays())
+
+        if cache:
+            _loaded[loaded_key] = geometry
+        return geometry
+
+    # Builds up to levels decimated versions of the geometry by edge collapse (see lod.simplify), each keeping about
+    # ratio of the faces of the one before.
+    # Stops early once a level would have fewer than min_faces faces or simplification gets stuck.
+    # The levels replace the old ones for every mesh of the geometry, including meshs loaded from the same file
+    # with the same settings while it is in use, see from_stl.
+    def build_lods(self, levels, ratio=0.5, min_faces=8):
+        self.lods = []
+        verts, faces = self.verts, self.faces
+        for _ in range(levels):
+            verts, new_faces = lod.simplify(verts, faces, int(len(faces) * ratio))
+            if len(new_faces) < min_faces or len(new_faces) >= len(faces):
+                break
+            faces = new_faces
+            self.lods.append(self._level(verts, faces))
+
+    @staticmethod
+    def _read_stl(stl_path, weld_tolerance):
+        # Binary files are read in chunks from a memory map, large scans don't need the whole file in memory
+        if stl_stream.is_binary(stl_path):
+            return Geometry(*stl_stream.load(stl_path, weld_tolerance))
+
+        stl_mesh = stl.Mesh.from_file(stl_path)
+        # Stored as (N, 3) arrays so the renderer can transform whole meshes at once
+        verts, faces = welding.weld(stl_mesh.vectors, weld_tolerance)
+        return Geometry(verts, faces, stl_mesh.normals, welding.vertex_normals(faces, stl_mesh.normals, len(verts)),
+                        (Vector3(stl_mesh.min_).get_tuple(), Vector3(stl_mesh.max_).get_tuple()))
+
+    # A level of detail with other verts and faces
+    def _level(self, verts, faces):
+        face_normals, vertex_normals = lod.normals(verts, faces)
+        return Geometry(verts, faces, face_normals, vertex_normals, self.bounds)
+
+    # The geometry and its levels of detail as {name: array}, see mesh_cache
+    def _arrays(self):
+        arrays = {'verts': self.verts, 'faces': self.faces, 'normals': self.normals,
+                  'vertex_normals': self.vertex_normals, 'bounds': np.array(self.bounds)}
+        for i, level in enumerate(self.lods):
+            arrays['lod_' + str(i) + '_verts'] = level.verts
+            arrays['lod_' + str(i) + '_faces'] = level.faces
+        return arrays
+
+    # Inverse of _arrays, which must hold at least _ARRAYS. Levels of detail are read up to the first one missing.
+    @staticmethod
+    def _from_arrays(arrays):
+        geometry = Geometry(arrays['verts'], arrays['faces'], arrays['normals'], arrays['vertex_normals'],
+                            tuple(tuple(corner) for corner in arrays['bounds']))
+        while all('lod_' + str(len(geometry.lods)) + name in arrays for name in ('_verts', '_faces')):
+            i = str(len(geometry.lods))
+            geometry.lods.append(geometry._level(arrays['lod_' + i + '_verts'], arrays['lod_' + i + '_faces']))
+        return geometry
 
 
+# Names of the arrays of Geometry._arrays that every geometry has
+_ARRAYS = ('verts', 'faces', 'normals', 'vertex_normals', 'bounds')
+
+# Geometry loaded by Geometry.from_stl that is still used by a Mesh
+_loaded = weakref.WeakValueDictionary()
+
+
+# A Geometry placed in the scene with a transform and a material.
+# Meshs created with the same geometry are instances of it: its arrays are stored once, and the renderer
+# transforms instances of one geometry together.
 class Mesh:
 
-    def __init__(self, diffuse_color, specular_color, ka, kd, ks, ke):
+    def __init__(self, diffuse_color, specular_color, ka, kd, ks, ke, geometry=None):
         self.transform = Transform()
-        self.vertex_normals = []
-        self.verts = []
-        self.faces = []
-        self.normals = np.array([])
-        self.bounds = np.array([])
+        self.geometry = Geometry() if geometry is None else geometry
+        self._lods = ([], [])
         self.diffuse_color = np.array(diffuse_color)
         self.specular_color = np.array(specular_color)
         self.ka = ka
@@ -19,47 +119,55 @@ class Mesh:
         self.ks = ks
         self.ke = ke
 
+    # lod_levels: number of decimated versions to build for distant rendering, see Geometry.build_lods
+    # weld_tolerance: size of the grid cells whose corners share a vertex, 0 only merges equal corners,
+    # see welding.weld
+    # cache: reuse the geometry and levels of detail processed from a file with the same content before,
+    # shared with the meshs already loaded from it in this process or read from disk, see mesh_cache
     @staticmethod
-    def from_stl(stl_path, diffuse_color, specular_color, ka, kd, ks, ke):
-        new_mesh = Mesh(diffuse_color, specular_color, ka, kd, ks, ke)
-        stl_mesh = stl.Mesh.from_file(stl_path)
-
-        new_mesh.normals = stl_mesh.normals
-        new_mesh.bounds = (Vector3(stl_mesh.min_).get_tuple(), Vector3(stl_mesh.max_).get_tuple())
-
-        vert_count = 0
-        temp = np.zeros((stl_mesh.points.shape[0], 3))
-        for i in range(stl_mesh.points.shape[0]):
-            new_mesh.faces.append([-1, -1, -1])
-            pts = [stl_mesh.v0[i],
-                   stl_mesh.v1[i],
-                   stl_mesh.v2[i]]
-            vals = [True, True, True]
-            for j in range(vert_count):
-                for k in range(3):
-                    if (temp[j] == pts[k]).all():  # if point k already exists in temp
-                        new_mesh.faces[i][k] = j
-                        vals[k] = False
-
-                        new_mesh.vertex_normals[j] = new_mesh.vertex_normals[j] + new_mesh.normals[i]  #
-
-
-            for k in range(3):
-                if vals[k]:
-                    temp[vert_count] = pts[k]
-                    new_mesh.faces[i][k] = vert_count
-
-                    new = [new_mesh.normals[i, 0], new_mesh.normals[i, 1], new_mesh.normals[i, 2]]
-                    new_mesh.vertex_normals.append(new_mesh.normals[i])  #
-
-                    vert_count += 1
-
-
-        for i in range(vert_count):
-            new_mesh.verts.append((temp[i, 0], temp[i, 1], temp[i, 2]))
-            new_mesh.vertex_normals[i] = _normalize(np.array(new_mesh.vertex_normals[i]))  #
-
-        return new_mesh
+    def from_stl(stl_path, diffuse_color, specular_color, ka, kd, ks, ke, lod_levels=0, weld_tolerance=0.0,
+                 cache=True):
+        geometry = Geometry.from_stl(stl_path, lod_levels, weld_tolerance, cache)
+        return Mesh(diffuse_color, specular_color, ka, kd, ks, ke, geometry)
+
+    # Another mesh of the same geometry with its own transform and material
+    def instance(self, diffuse_color, specular_color, ka, kd, ks, ke):
+        return Mesh(diffuse_color, specular_color, ka, kd, ks, ke, self.geometry)
+
+    @property
+    def verts(self):
+        return self.geometry.verts
+
+    @property
+    def faces(self):
+        return self.geometry.faces
+
+    @property
+    def normals(self):
+        return self.geometry.normals
+
+    @property
+    def vertex_normals(self):
+        return self.geometry.vertex_normals
+
+    @property
+    def bounds(self):
+        return self.geometry.bounds
+
+    # The levels of detail of the geometry as meshs sharing the transform and material of this one,
+    # also when they are replaced after the levels were made
+    @property
+    def lods(self):
+        levels, meshs = self._lods
+        if levels is not self.geometry.lods:
+            meshs = [Mesh(self.diffuse_color, self.specular_color, self.ka, self.kd, self.ks, self.ke, level)
+                     for level in self.geometry.lods]
+            self._lods = (self.geometry.lods, meshs)
+        for level in meshs:
+            level.transform = self.transform
+            level.diffuse_color, level.specular_color = self.diffuse_color, self.specular_color
+            level.ka, level.kd, level.ks, level.ke = self.ka, self.kd, self.ks, self.ke
+        return meshs
 
 
 class Vector3:
@@ -77,9 +185,3 @@ class Vector3:
     def get_tuple(self):
         return (self.x, self.y, self.z)
 
-
-def _normalize(v):
-    n = np.linalg.norm(v)
-    if n == 0:
-        return v
-    return v / np.linalg.norm(v)
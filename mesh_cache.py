@@ -0,0 +1,69 @@
+import os
+import hashlib
+import shutil
+import numpy as np
+
+# Directory of the cache, an empty string turns caching off
+CACHE_ENV = "MESH_CACHE_DIR"
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "animated-scene-renderer", "meshes")
+
+# Bumped whenever the processing of a mesh changes, so older entries aren't used
+_VERSION = 1
+
+
+# On-disk cache of processed mesh geometry. Entries are keyed by the content hash of the source file and the
+# settings it was processed with, so an edited or moved file never hits a stale entry.
+# Every array is stored as a .npy file in the entry's directory and memory-mapped read-only when loaded.
+
+
+# Returns the cache key of a file processed with settings (a tuple of reprs), or None if caching is off
+def key(file_path, settings):
+    if _cache_dir() == "":
+        return None
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(repr((_VERSION, settings)).encode())
+    return digest.hexdigest()
+
+
+# Returns the cached {name: array} of key, memory-mapped, or None if there is no usable entry.
+# required: names the entry must have. An entry that is missing one or can't be read is removed, so the caller
+# can store a new one in its place.
+def load(key, required=()):
+    if key is None:
+        return None
+    path = os.path.join(_cache_dir(), key)
+    try:
+        arrays = {name[:-4]: np.asarray(np.load(os.path.join(path, name), mmap_mode='r'))
+                  for name in os.listdir(path) if name.endswith(".npy")}
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        arrays = {}
+    if arrays and all(name in arrays for name in required):
+        return arrays
+    shutil.rmtree(path, ignore_errors=True)
+    return None
+
+
+# Stores {name: array} under key. The entry is written aside and renamed into place, so concurrent loads never see
+# a partial one. Failing to write the cache doesn't fail the caller, the mesh is just processed again next time.
+def store(key, arrays):
+    if key is None:
+        return
+    path = os.path.join(_cache_dir(), key)
+    temp = path + ".tmp-" + str(os.getpid())
+    try:
+        os.makedirs(temp, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(temp, name + ".npy"), np.asarray(array))
+        os.rename(temp, path)
+    except OSError:
+        # Also when another process stored the same entry first
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def _cache_dir():
+    return os.environ.get(CACHE_ENV, DEFAULT_DIR)
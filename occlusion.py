@@ -0,0 +1,89 @@
+import numpy as np
+
+
+# Returns a draw list (see rasterizer.rasterize) of every face in face_ids[i] of the TransformedMeshs frames[i],
+# sorted front to back by the nearest screen space depth of each face
+def front_to_back(frames, face_ids):
+    mesh_ids = []
+    all_face_ids = []
+    nearest = []
+    for mesh_id, (frame, ids) in enumerate(zip(frames, face_ids)):
+        ids = np.asarray(ids, dtype=int)
+        mesh_ids.append(np.full(len(ids), mesh_id))
+        all_face_ids.append(ids)
+        nearest.append(frame.screen_bounds(ids)[0][:, 1])
+    if len(mesh_ids) == 0:
+        return []
+    mesh_ids = np.concatenate(mesh_ids)
+    all_face_ids = np.concatenate(all_face_ids)
+    order = np.argsort(np.concatenate(nearest), kind='stable')
+    mesh_ids = mesh_ids[order]
+    all_face_ids = all_face_ids[order]
+
+    # Group consecutive faces of the same mesh into runs
+    starts = np.flatnonzero(np.diff(mesh_ids)) + 1
+    return [(int(run_mesh_ids[0]), run_face_ids)
+            for run_mesh_ids, run_face_ids in zip(np.split(mesh_ids, starts), np.split(all_face_ids, starts))
+            if len(run_mesh_ids) > 0]
+
+
+# Coarse max-depth pyramid over a rect of a z-buffer (y is depth, smaller is nearer).
+# Level 0 keeps the furthest depth of every tile_size square of pixels, every level above merges 2x2 cells.
+# A face whose nearest depth is behind the furthest depth over its bounding box can't pass the z-test anywhere.
+class HierarchicalZ:
+    def __init__(self, z_buffer, rect=None, tile_size=8):
+        if rect is None:
+            rect = (0, z_buffer.shape[0] - 1, 0, z_buffer.shape[1] - 1)
+        self.z_buffer = z_buffer
+        self.x0, self.y0 = rect[0], rect[2]
+        self.x1, self.y1 = rect[1], rect[3]
+        self.tile_size = tile_size
+
+        self.levels = [_max_reduce(z_buffer[self.x0:self.x1 + 1, self.y0:self.y1 + 1], tile_size)]
+        while self.levels[-1].shape[0] > 1 or self.levels[-1].shape[1] > 1:
+            self.levels.append(_max_reduce(self.levels[-1], 2))
+
+    # True if nothing at depth nearest or further can pass the z-test inside the display bounds (x0, x1, y0, y1)
+    def occluded(self, bounds, nearest):
+        cells = self._cells(bounds)
+        if cells is None:
+            return False
+        # Finest level where the bounds span at most 2x2 cells
+        level = 0
+        cx0, cx1, cy0, cy1 = cells
+        while cx1 - cx0 > 1 or cy1 - cy0 > 1:
+            level += 1
+            cx0, cx1, cy0, cy1 = cx0 >> 1, cx1 >> 1, cy0 >> 1, cy1 >> 1
+        return nearest > self.levels[level][cx0:cx1 + 1, cy0:cy1 + 1].max()
+
+    # Refreshes every level over the display bounds (x0, x1, y0, y1) after the z-buffer changed there
+    def update(self, bounds):
+        cells = self._cells(bounds)
+        if cells is None:
+            return
+        cx0, cx1, cy0, cy1 = cells
+        size = self.tile_size
+        px0, py0 = self.x0 + cx0 * size, self.y0 + cy0 * size
+        px1, py1 = min(self.x1 + 1, self.x0 + (cx1 + 1) * size), min(self.y1 + 1, self.y0 + (cy1 + 1) * size)
+        self.levels[0][cx0:cx1 + 1, cy0:cy1 + 1] = _max_reduce(self.z_buffer[px0:px1, py0:py1], size)
+
+        for level in range(1, len(self.levels)):
+            below = self.levels[level - 1]
+            cx0, cx1, cy0, cy1 = cx0 >> 1, cx1 >> 1, cy0 >> 1, cy1 >> 1
+            self.levels[level][cx0:cx1 + 1, cy0:cy1 + 1] = \
+                _max_reduce(below[cx0 * 2:(cx1 + 1) * 2, cy0 * 2:(cy1 + 1) * 2], 2)
+
+    # Level 0 cells (cx0, cx1, cy0, cy1) overlapping the display bounds, or None if they miss the rect
+    def _cells(self, bounds):
+        x0, x1 = max(bounds[0], self.x0), min(bounds[1], self.x1)
+        y0, y1 = max(bounds[2], self.y0), min(bounds[3], self.y1)
+        if x0 > x1 or y0 > y1:
+            return None
+        size = self.tile_size
+        return (x0 - self.x0) // size, (x1 - self.x0) // size, (y0 - self.y0) // size, (y1 - self.y0) // size
+
+
+# Max over every size x size block of a 2D array, partial blocks at the edges included
+def _max_reduce(a, size):
+    rows = np.maximum.reduceat(a, np.arange(0, a.shape[0], size), axis=0)
+    return np.maximum.reduceat(rows, np.arange(0, a.shape[1], size), axis=1)
@@ -0,0 +1,60 @@
+import numpy as np
+from PIL import Image
+
+# Bits per channel of the color lookup table, colors are mapped by their top LUT_BITS bits of red, green and blue
+LUT_BITS = 5
+
+
+# One palette of at most colors colors for every frame of an animation, built from a sample of its
+# (height, width, 3) uint8 images. Returns the (n, 3) uint8 palette, the sampled colors themselves if there are few enough.
+def build_palette(images, colors=256):
+    pixels = np.concatenate([np.asarray(image).reshape(-1, 3) for image in images])
+    packed = np.unique(_pack(pixels))
+    if len(packed) <= colors:
+        return np.stack([packed >> 16, (packed >> 8) & 255, packed & 255], axis=1).astype(np.uint8)
+    # Median cut over all sampled pixels, an image only needs the pixels, not their layout
+    quantized = Image.fromarray(pixels.reshape(-1, 1, 3)).quantize(colors, method=Image.Quantize.MEDIANCUT)
+    used = len(quantized.getcolors(colors))
+    return np.array(quantized.getpalette()[:3 * used], dtype=np.uint8).reshape(-1, 3)
+
+
+# Returns the lookup of palette indices used by quantize, a (table, colors, indices) tuple.
+# Colors in the palette, which is every sampled color of a palette build_palette didn't reduce, map to their own
+# index through the sorted packed colors and their indices. Any other color goes through the table of the nearest
+# palette index for every color at LUT_BITS per channel, indexed by the color's (r, g, b) top bits as
+# r << 2 * LUT_BITS | g << LUT_BITS | b.
+def color_lut(palette):
+    levels = 1 << LUT_BITS
+    # Every cell is matched by its center color
+    centers = (np.arange(levels) << (8 - LUT_BITS)) + (1 << (7 - LUT_BITS))
+    cells = np.stack(np.meshgrid(centers, centers, centers, indexing='ij'), axis=-1).reshape(-1, 3)
+    palette = np.asarray(palette, dtype=np.uint8)
+    distances = palette.astype(float)
+    table = np.empty(len(cells), dtype=np.uint8)
+    for start in range(0, len(cells), 4096):
+        diff = cells[start:start + 4096, np.newaxis, :] - distances[np.newaxis]
+        table[start:start + 4096] = np.argmin(np.sum(diff * diff, axis=2), axis=1)
+
+    # The first index of every color, should the palette hold one twice
+    colors, indices = np.unique(_pack(palette), return_index=True)
+    return table, colors, indices.astype(np.uint8)
+
+
+# Maps a (height, width, 3) uint8 image to (height, width) uint8 palette indices with a color_lut
+def quantize(image, lut):
+    table, colors, indices = lut
+    shift = 8 - LUT_BITS
+    r, g, b = (image[..., k] >> shift for k in range(3))
+    cell = (r.astype(np.intp) << 2 * LUT_BITS) | (g.astype(np.intp) << LUT_BITS) | b
+    mapped = table[cell]
+
+    packed = _pack(image)
+    found = np.minimum(np.searchsorted(colors, packed), len(colors) - 1)
+    exact = colors[found] == packed
+    mapped[exact] = indices[found[exact]]
+    return mapped
+
+
+# (r, g, b) colors packed into one int32 as r << 16 | g << 8 | b
+def _pack(colors):
+    return (colors[..., 0].astype(np.int32) << 16) | (colors[..., 1].astype(np.int32) << 8) | colors[..., 2]
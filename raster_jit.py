@@ -0,0 +1,146 @@
+from fractions import Fraction
+import numpy as np
+
+# Numba is optional, without it the G-buffer is filled by rasterizer.rasterize
+try:
+    from numba import njit, types
+    from numba.extending import intrinsic
+except ImportError:
+    njit = None
+
+available = njit is not None
+
+# Whether NumPy's BLAS fuses the multiply-adds of np.dot and np.matmul, rounding a * b + c once.
+# rasterizer computes barycentric coordinates with them, the kernel has to round the same way.
+_fused = bool(np.dot([-(1 + 2.0 ** -29), 1 + 2.0 ** -30], [1.0, 1 + 2.0 ** -30]) != 0.0)
+
+
+# Geometry pass of gbuffer.GBuffer.rasterize as one compiled loop over every triangle of draw_list.
+# Produces the same G-buffer as rasterizer.rasterize: same coverage, barycentric and z-test arithmetic,
+# in the same order, without interpreter overhead per face.
+def rasterize(gbuffer, frames, draw_list, width, height, depth_tested=True):
+    verts, bary, clipped, mesh_ids, face_ids = _triangles(frames, draw_list)
+    if len(verts) == 0:
+        return
+    x0, x1, y0, y1 = gbuffer.rect()
+    _kernel(verts, bary, clipped, mesh_ids, face_ids, width, height, x0, x1, y0, y1, depth_tested,
+            gbuffer.depth, gbuffer.mesh_id, gbuffer.face_id, gbuffer.bc, _fused)
+
+
+# Flattens draw_list into arrays of screen space triangles in draw order: (T, 3, 3) verts, (T, 3, 3) bary maps,
+# a mask of the ones clipped from a larger face (see vertex_stage.TransformedMesh.triangles) and their mesh and face ids
+def _triangles(frames, draw_list):
+    verts, bary, clipped, mesh_ids, face_ids = [], [], [], [], []
+    for mesh_id, ids in draw_list:
+        frame = frames[mesh_id]
+        ids = np.asarray(ids, dtype=int)
+        if len(ids) == 0:
+            continue
+        if not frame.clipped or not np.isin(ids, list(frame.clipped)).any():
+            verts.append(frame.screen_verts[frame.faces[ids]])
+            bary.append(np.broadcast_to(np.identity(3), (len(ids), 3, 3)))
+            clipped.append(np.zeros(len(ids), dtype=bool))
+            mesh_ids.append(np.full(len(ids), mesh_id))
+            face_ids.append(ids)
+            continue
+        for face_id in ids:
+            for face_verts, face_bary in frame.triangles(face_id):
+                verts.append(face_verts[np.newaxis])
+                bary.append((np.identity(3) if face_bary is None else face_bary)[np.newaxis])
+                clipped.append(np.array([face_bary is not None]))
+                mesh_ids.append(np.array([mesh_id]))
+                face_ids.append(np.array([face_id]))
+    if len(verts) == 0:
+        return (np.zeros((0, 3, 3)),) * 2 + (np.zeros(0, dtype=bool),) + (np.zeros(0, dtype=np.int32),) * 2
+    return (np.ascontiguousarray(np.concatenate(verts), dtype=float),
+            np.ascontiguousarray(np.concatenate(bary), dtype=float),
+            np.concatenate(clipped),
+            np.concatenate(mesh_ids).astype(np.int32),
+            np.concatenate(face_ids).astype(np.int32))
+
+
+# Mirrors rasterizer.bounding_box, raster_triangle, depth_test and gbuffer.GBuffer.write for every triangle.
+# rect (x0, x1, y0, y1) is the display rect of the G-buffer, z_buffer is indexed with display coordinates.
+# fused: round dot products like NumPy's BLAS, see _mul_add
+def _raster_triangles(verts, bary, clipped, mesh_ids, face_ids, width, height, x0, x1, y0, y1, depth_tested,
+                      z_buffer, out_mesh_id, out_face_id, out_bc, fused):
+    for t in range(verts.shape[0]):
+        v = verts[t]
+        bx0 = max(_to_display(min(v[0, 0], v[1, 0], v[2, 0]), width), x0)
+        bx1 = min(_to_display(max(v[0, 0], v[1, 0], v[2, 0]), width), x1)
+        by0 = max(_to_display(min(v[0, 2], v[1, 2], v[2, 2]), height), y0)
+        by1 = min(_to_display(max(v[0, 2], v[1, 2], v[2, 2]), height), y1)
+
+        # Per face terms of rasterizer._bc_coords, its np.dot calls are _mul_add(z, z, x * x)
+        ax, az = v[0, 0], v[0, 2]
+        v0x, v0z = v[1, 0] - ax, v[1, 2] - az
+        v1x, v1z = v[2, 0] - ax, v[2, 2] - az
+        d00 = _mul_add(v0z, v0z, v0x * v0x, fused)
+        d01 = _mul_add(v0z, v1z, v0x * v1x, fused)
+        d11 = _mul_add(v1z, v1z, v1x * v1x, fused)
+        denom = d00 * d11 - d01 * d01
+        # Degenerate (edge on) faces divide by zero, nan is never covered
+        if denom == 0.0:
+            continue
+
+        for x in range(bx0, bx1 + 1):
+            v2x = (2.0 * x / width - 1.0) - ax
+            for y in range(by0, by1 + 1):
+                v2z = (2.0 * y / height - 1.0) - az
+                d20 = _mul_add(v2z, v0z, v2x * v0x, fused)
+                d21 = _mul_add(v2z, v1z, v2x * v1x, fused)
+                b1 = (d11 * d20 - d01 * d21) / denom
+                b2 = (d00 * d21 - d01 * d20) / denom
+                b0 = 1.0 - b1 - b2
+                if not (0.0 <= b0 <= 1.0 and 0.0 <= b1 <= 1.0 and 0.0 <= b2 <= 1.0):
+                    continue
+
+                depth = b0 * v[0, 1] + b1 * v[1, 1] + b2 * v[2, 1]
+                if depth_tested:
+                    if not (-1.0 <= depth <= 1.0 and z_buffer[x, y] >= depth):
+                        continue
+                    z_buffer[x, y] = depth
+
+                # np.matmul(bc, bary) of rasterizer.rasterize
+                if clipped[t]:
+                    m = bary[t]
+                    b0, b1, b2 = (_mul_add(b2, m[2, 0], _mul_add(b1, m[1, 0], b0 * m[0, 0], fused), fused),
+                                  _mul_add(b2, m[2, 1], _mul_add(b1, m[1, 1], b0 * m[0, 1], fused), fused),
+                                  _mul_add(b2, m[2, 2], _mul_add(b1, m[1, 2], b0 * m[0, 2], fused), fused))
+                out_mesh_id[x - x0, y - y0] = mesh_ids[t]
+                out_face_id[x - x0, y - y0] = face_ids[t]
+                out_bc[x - x0, y - y0, 0] = b0
+                out_bc[x - x0, y - y0, 1] = b1
+                out_bc[x - x0, y - y0, 2] = b2
+
+
+# rasterizer._to_display
+def _to_display(p, size):
+    return int(min(max((p / 2 + 0.5) * size, 0.0), size - 1))
+
+
+# a * b + c, rounded once if fused
+def _mul_add(a, b, c, fused):
+    if fused:
+        return _fma(a, b, c)
+    return a * b + c
+
+
+# a * b + c rounded once, like math.fma of Python 3.13
+def _fma(a, b, c):
+    return float(Fraction(a) * Fraction(b) + Fraction(c))
+
+
+if available:
+    # The compiled kernel uses the hardware instruction, or LLVM's correctly rounded fallback
+    @intrinsic
+    def _fma(typingctx, a, b, c):
+        def codegen(context, builder, signature, args):
+            return builder.fma(*args)
+        return types.float64(types.float64, types.float64, types.float64), codegen
+
+    _to_display = njit(cache=True)(_to_display)
+    _mul_add = njit(cache=True)(_mul_add)
+    _kernel = njit(cache=True)(_raster_triangles)
+else:
+    _kernel = _raster_triangles
@@ -0,0 +1,185 @@
+import numpy as np
+from framebuffer import to_color
+
+
+# The rasterization core: rasterizes the faces of draw_list, a sequence of (mesh_id, face_ids) runs into the
+# TransformedMeshs frames, one face at a time. Pixels that pass coverage and, if depth_tested, the z_buffer test
+# are handed to target.write (a ColorTarget or a gbuffer.GBuffer).
+# rect (x0, x1, y0, y1) limits rasterization to part of the display.
+# hiz is an optional occlusion.HierarchicalZ over z_buffer, faces behind it are skipped without being rasterized.
+# scanline: walk covered spans with raster_spans instead of testing the whole bounding box with raster_triangle
+def rasterize(target, z_buffer, frames, draw_list, width, height, depth_tested=True, rect=None, hiz=None,
+              scanline=False):
+    raster = raster_spans if scanline else raster_triangle
+    for mesh_id, ids in draw_list:
+        frame = frames[mesh_id]
+        for face_id in ids:
+            # Usually the face itself, or the triangles left of it after near plane clipping
+            for verts, bary in frame.triangles(face_id):
+                if hiz is not None and hiz.occluded(bounding_box(verts, width, height, rect), verts[:, 1].min()):
+                    continue
+
+                xs, ys, bc, depth = raster(verts, width, height, rect)
+                if depth_tested:
+                    visible = depth_test(z_buffer, xs, ys, depth)
+                    xs, ys, bc, depth = xs[visible], ys[visible], bc[visible], depth[visible]
+                if len(xs) == 0:
+                    continue
+                if bary is not None:
+                    bc = np.matmul(bc, bary)
+                target.write(mesh_id, frame, face_id, xs, ys, bc, depth)
+                if hiz is not None:
+                    hiz.update((xs.min(), xs.max(), ys.min(), ys.max()))
+
+
+# Forward rendering target of the core, shades pixels straight into a color buffer with a shading.Shader
+class ColorTarget:
+    def __init__(self, render, shader):
+        self.render = render
+        self.shader = shader
+
+    def write(self, mesh_id, frame, face_id, xs, ys, bc, depth):
+        self.render[xs, ys] = to_color(self.shader.shade(mesh_id, frame, np.full(len(xs), face_id), bc, depth))
+
+
+# Returns the display space bounds (x0, x1, y0, y1) of a face's screen space verts, clamped to the screen
+# and to rect if given. Both ends are inclusive.
+def bounding_box(verts, width, height, rect=None):
+    low = verts.min(axis=0)
+    high = verts.max(axis=0)
+    x0 = _to_display(low[0], width)
+    x1 = _to_display(high[0], width)
+    y0 = _to_display(low[2], height)
+    y1 = _to_display(high[2], height)
+    if rect is not None:
+        x0, x1 = max(x0, rect[0]), min(x1, rect[1])
+        y0, y1 = max(y0, rect[2]), min(y1, rect[3])
+    return x0, x1, y0, y1
+
+
+# bounding_box for n faces at once from their (n, 3) screen space (low, high) corners,
+# returns four (n,) int arrays without a rect clamp
+def bounding_boxes(low, high, width, height):
+    x0 = _to_display_array(low[:, 0], width)
+    x1 = _to_display_array(high[:, 0], width)
+    y0 = _to_display_array(low[:, 2], height)
+    y1 = _to_display_array(high[:, 2], height)
+    return x0, x1, y0, y1
+
+
+# Rasterizes one face over its whole bounding box at once.
+# verts is the (3, 3) screen space face, x is horizontal, y is depth and z is vertical.
+# Returns (xs, ys, bc, depth) for every covered pixel: display coordinates, (n, 3) barycentric
+# coordinates [->a, ->b, ->c] and the interpolated screen space depth.
+# rect (x0, x1, y0, y1) limits rasterization to part of the display.
+def raster_triangle(verts, width, height, rect=None):
+    x0, x1, y0, y1 = bounding_box(verts, width, height, rect)
+    xs, ys = np.meshgrid(np.arange(x0, x1 + 1), np.arange(y0, y1 + 1), indexing='ij')
+    xs = xs.ravel()
+    ys = ys.ravel()
+
+    bc = _bc_coords(verts, 2.0 * xs / width - 1.0, 2.0 * ys / height - 1.0)
+    covered = ((0 <= bc) & (bc <= 1)).all(axis=1)
+    xs = xs[covered]
+    ys = ys[covered]
+    bc = bc[covered]
+
+    depth = bc[:, 0] * verts[0, 1] + bc[:, 1] * verts[1, 1] + bc[:, 2] * verts[2, 1]
+    return xs, ys, bc, depth
+
+
+# Scanline version of raster_triangle with the same arguments and results, pixels come row by row.
+# An active edge table gives the span of every display row the face crosses, so only the pixels on it are
+# visited, which pays off for long thin faces that cover little of their bounding box.
+# Spans are widened by a pixel at both ends and their pixels go through the same barycentric test as
+# raster_triangle, so pixels lying on an edge are covered exactly when raster_triangle covers them.
+def raster_spans(verts, width, height, rect=None):
+    # Active edge table: with the verts sorted by z, the long edge a->c spans every row of the face,
+    # on the other side a->b is active below b and b->c above it
+    a, b, c = verts[np.argsort(verts[:, 2], kind='stable')]
+    if not a[2] < c[2]:
+        # Flat faces have no rows to walk
+        return raster_triangle(verts, width, height, rect)
+
+    x0, x1, y0, y1 = bounding_box(verts, width, height, rect)
+    ys = np.arange(y0, y1 + 1)
+    pz = np.clip(2.0 * ys / height - 1.0, a[2], c[2])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        long_x = _edge_x(a, c, pz)
+        short_x = np.where(pz < b[2], _edge_x(a, b, pz), np.where(pz > b[2], _edge_x(b, c, pz), b[0]))
+
+    # Display columns of every row's span, plus the pixel beyond each end
+    starts = np.ceil((np.minimum(long_x, short_x) + 1.0) * width / 2).astype(int) - 1
+    ends = np.floor((np.maximum(long_x, short_x) + 1.0) * width / 2).astype(int) + 1
+    starts = np.maximum(starts, x0)
+    lengths = np.maximum(np.minimum(ends, x1) - starts + 1, 0)
+    count = lengths.sum()
+    if count == 0:
+        return _no_pixels()
+
+    rows = np.repeat(np.arange(len(ys)), lengths)
+    steps = np.arange(count) - np.repeat(np.cumsum(lengths) - lengths, lengths)  # pixel index within its span
+    xs = starts[rows] + steps
+    ys = ys[rows]
+
+    bc = _bc_coords(verts, 2.0 * xs / width - 1.0, 2.0 * ys / height - 1.0)
+    covered = ((0 <= bc) & (bc <= 1)).all(axis=1)
+    xs = xs[covered]
+    ys = ys[covered]
+    bc = bc[covered]
+
+    depth = bc[:, 0] * verts[0, 1] + bc[:, 1] * verts[1, 1] + bc[:, 2] * verts[2, 1]
+    return xs, ys, bc, depth
+
+
+# Tests pixels against the z-buffer and the screen's depth range, writing the ones that pass.
+# Returns a mask of the pixels that passed.
+def depth_test(z_buffer, xs, ys, depth):
+    visible = (-1 <= depth) & (depth <= 1) & (z_buffer[xs, ys] >= depth)
+    z_buffer[xs[visible], ys[visible]] = depth[visible]
+    return visible
+
+
+# Barycentric coordinates of the points (px, pz) in the x/z plane of verts, returns (n, 3)
+def _bc_coords(verts, px, pz):
+    a = verts[0, ::2]
+    v0 = verts[1, ::2] - a
+    v1 = verts[2, ::2] - a
+    v2 = np.stack((px - a[0], pz - a[1]), axis=1)
+    d00 = np.dot(v0, v0)
+    d01 = np.dot(v0, v1)
+    d11 = np.dot(v1, v1)
+    d20 = _dot(v2, v0)
+    d21 = _dot(v2, v1)
+    denom = d00 * d11 - d01 * d01
+    # Degenerate (edge on) faces give nan coordinates, which are never in range
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v = (d11 * d20 - d01 * d21) / denom
+        w = (d00 * d21 - d01 * d20) / denom
+    u = 1.0 - v - w
+    return np.stack((u, v, w), axis=1)
+
+
+# Dot products of the (n, 2) vectors with vec, one np.dot per row like the per pixel loops did.
+# A stacked matmul of vectors runs the same kernel as np.dot, which may fuse the multiply-add where
+# a * b + c * d would not, so a pixel on an edge lands on the same side of it.
+def _dot(vectors, vec):
+    return np.matmul(vectors[:, np.newaxis, :], vec[:, np.newaxis])[:, 0, 0]
+
+
+# Screen space x of the edge a->b at the heights pz
+def _edge_x(a, b, pz):
+    return a[0] + (pz - a[2]) * (b[0] - a[0]) / (b[2] - a[2])
+
+
+def _no_pixels():
+    return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros((0, 3)), np.zeros(0)
+
+
+# Screen space [-1, 1] to a display pixel, clamped to [0, size-1]
+def _to_display(p, size):
+    return int(min(max((p / 2 + 0.5) * size, 0), size - 1))
+
+
+def _to_display_array(p, size):
+    return np.clip((p / 2 + 0.5) * size, 0, size - 1).astype(int)
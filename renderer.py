@@ -1,6 +1,16 @@
-import math
 from enum import Enum
 import numpy as np
+import shading
+from vertex_stage import TransformedMesh, transform_instances
+from rasterizer import rasterize, ColorTarget
+from gbuffer import GBuffer
+from tiles import TileRenderer
+from occlusion import front_to_back, HierarchicalZ
+from frustum import bounds_outside
+from framebuffer import FrameBuffers
+import lod
+import raster_jit
+import dirty_rects
 
 
 class RenderAlgorithm(Enum):
@@ -9,454 +19,231 @@ class RenderAlgorithm(Enum):
     PHONG = 2
     BARYCENTRIC = 3
     DEPTH = 4
+    GOURAUD = 5
+
+
+# Shader run by the rasterization core for every RenderAlgorithm, see shading.Shader
+_SHADERS = {
+    RenderAlgorithm.NONE: shading.NoneShader,
+    RenderAlgorithm.FLAT: shading.FlatShader,
+    RenderAlgorithm.PHONG: shading.PhongShader,
+    RenderAlgorithm.BARYCENTRIC: shading.BarycentricShader,
+    RenderAlgorithm.DEPTH: shading.DepthShader,
+    RenderAlgorithm.GOURAUD: shading.GouraudShader,
+}
+
 
 class Renderer:
-    def __init__(self, screen, camera, meshs, light):
+    # deferred: shade once per visible pixel from a G-buffer instead of once per z-test pass
+    # workers: with more than one, frames are split into tile_size tiles rendered in that many processes
+    # occlusion_culling: draw faces front to back and skip the ones hidden behind already drawn geometry
+    # frustum_culling: skip meshes whose bounds are outside the camera's view volume
+    # scanline: rasterize covered spans row by row instead of testing every pixel of each face's bounding box
+    # jit: rasterize with a compiled kernel when Numba is installed (see raster_jit), same output as without
+    # color_dtype, depth_dtype: precision of the color and depth buffers reused across frames,
+    # see framebuffer.FrameBuffers
+    # lod_faces_per_pixel: meshs with levels of detail (see Geometry.build_lods) render the most detailed level with
+    # at most this many faces per pixel of their projected bounds
+    # static_caching: reuse the transformed vertices of meshs without animation curves across frames and, while
+    # the camera and light don't move either, render them once into a layer the moving meshs are drawn on
+    # incremental: on top of a static layer, only redraw the rectangles the moving meshs cover in this or the last
+    # frame and keep the rest of the last frame. Needs static_caching and a single process, and the returned frames
+    # must not be modified.
+    def __init__(self, screen, camera, meshs, light, deferred=False, workers=1, tile_size=64,
+                 occlusion_culling=False, frustum_culling=True, scanline=False, jit=False,
+                 color_dtype=np.uint8, depth_dtype=np.float64, lod_faces_per_pixel=0.5, static_caching=True,
+                 incremental=False):
         self.screen = screen
         self.camera = camera
         self.meshs = meshs
         self.light = light
+        self.deferred = deferred
+        self.occlusion_culling = occlusion_culling
+        self.frustum_culling = frustum_culling
+        self.scanline = scanline
+        self.jit = jit
+        self.lod_faces_per_pixel = lod_faces_per_pixel
+        self.static_caching = static_caching
+        self._static_frames = {}
+        self._static_layers = {}
+        self.incremental = incremental
+        self._last_frame = None
+        self.buffers = FrameBuffers(color_dtype, depth_dtype)
+        self.tiles = TileRenderer(workers, tile_size, color_dtype, depth_dtype) if workers > 1 else None
 
     def render(self, render_algorithm: RenderAlgorithm, bg_color, ambient_light, time):
-        frame = None
-        if render_algorithm == RenderAlgorithm.NONE:
-            frame = self.no_shading(bg_color, time)
-        elif render_algorithm == RenderAlgorithm.FLAT:
-            frame = self.flat_shading(bg_color, ambient_light, time)
-        elif render_algorithm == RenderAlgorithm.PHONG:
-            frame = self.phong_shading(bg_color, ambient_light, time)
-        elif render_algorithm == RenderAlgorithm.BARYCENTRIC:
-            frame = self.barycentric_shading(bg_color, ambient_light, time)
-        elif render_algorithm == RenderAlgorithm.DEPTH:
-            frame = self.depth_shading(bg_color, ambient_light, time)
+        frame = self.render_frame(render_algorithm, bg_color, ambient_light, time)
         self.screen.draw(frame)
         return frame
 
-    def no_shading(self, bg_color, time):
+    # Renders and returns a frame without drawing it to the screen.
+    # The frame is a reused buffer, the next frame of the same size overwrites it, so copy it to keep it.
+    # width, height: render at another resolution than the screen's, e.g. for a quick preview
+    def render_frame(self, render_algorithm: RenderAlgorithm, bg_color, ambient_light, time, width=None, height=None):
+        width = self.screen.width if width is None else width
+        height = self.screen.height if height is None else height
         self.camera.set_time(time)
-        render = np.full((self.screen.width, self.screen.height, 3), bg_color)
-        for mesh in self.meshs:
-            for face in mesh.faces:
-                verts = np.array(
-                    [self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[0]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[1]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[2]], time))]
-                )
-                low = np.array(verts[0])
-                high = np.array(verts[0])
-                for vert in verts:
-                    for i in range(3):
-                        low[i] = min(low[i], vert[i])
-                        high[i] = max(high[i], vert[i])
-
-                dis_low = _screen_to_display(low, self.screen.width, self.screen.height)
-                dis_high = _screen_to_display(high, self.screen.width, self.screen.height)
-                dis_low[0] = max(0, dis_low[0])
-                dis_low[2] = max(0, dis_low[2])
-                dis_low[0] = min(self.screen.width-1, dis_low[0])
-                dis_low[2] = min(self.screen.height-1, dis_low[2])
-                dis_high[0] = max(0, dis_high[0])
-                dis_high[2] = max(0, dis_high[2])
-                dis_high[0] = min(self.screen.width-1, dis_high[0])
-                dis_high[2] = min(self.screen.height-1, dis_high[2])
-
-                # Iterate through displayed pixels
-                for i in range(dis_high[0] - dis_low[0] + 1):
-                    for j in range(dis_high[2] - dis_low[2] + 1):
-                        p = np.array([dis_low[0]+i, dis_low[2]+j], dtype=int)
-
-                        a = np.array([verts[0,0],verts[0,2]], dtype=float)
-                        b = np.array([verts[1,0],verts[1,2]], dtype=float)
-                        c = np.array([verts[2,0],verts[2,2]], dtype=float)
-                        p2 = _display_to_screen_bc(p, self.screen.width, self.screen.height)
-
-                        bc = _bc_coords(a, b, c, p2)
-                        if _bary_in_range(bc[0], bc[1], bc[2]):
-                            render[p[0], p[1]] = [0,0,0]
-                # If going for performance, remove following line, else this is more fun to watch
-                # self.screen.draw(render)
+        frames = self._vertex_stage(time, width, height)
+        last_frame, self._last_frame = self._last_frame, None
+
+        # From a static view, static meshes come from a cached layer and only the moving ones are drawn
+        layer = None
+        if self.static_caching and _SHADERS[render_algorithm].layer_cacheable and \
+                self.camera.transform.is_static() and self.light.transform.is_static():
+            static = [frame for frame in frames if frame.mesh.transform.is_static()]
+            if static:
+                layer = self._static_layer(static, render_algorithm, bg_color, ambient_light, time, width, height)
+                frames = [frame for frame in frames if not frame.mesh.transform.is_static()]
+
+        shader = self._shader(render_algorithm, frames, ambient_light, time)
+        face_ids = self._visible_faces(frames, shader)
+
+        # Tiled: deferred shading of every tile in a worker process, see tiles.TileRenderer
+        if self.tiles is not None:
+            return self.tiles.render(frames, face_ids, shader, bg_color, width, height, self.occlusion_culling,
+                                     self.scanline, self.jit, layer)
+
+        if layer is not None and self.incremental:
+            boxes = dirty_rects.face_boxes(frames, face_ids, width, height)
+            rects = dirty_rects.mesh_rects(boxes)
+            self._last_frame = (layer, rects)
+            # The last frame was drawn over the same layer: outside of where the moving meshes were and are now,
+            # it is already this frame
+            if last_frame is not None and last_frame[0] is layer:
+                render, z_buffer = self.buffers.retained(width, height)
+                for x0, x1, y0, y1 in dirty_rects.merge(last_frame[1] + rects):
+                    render[x0:x1 + 1, y0:y1 + 1] = layer[0][x0:x1 + 1, y0:y1 + 1]
+                    z_buffer[x0:x1 + 1, y0:y1 + 1] = layer[1][x0:x1 + 1, y0:y1 + 1]
+                    self._draw(frames, dirty_rects.faces_in_rect(face_ids, boxes, (x0, x1, y0, y1)), shader,
+                               render, z_buffer, (x0, x1, y0, y1))
+                return render
+
+        render, z_buffer = self.buffers.clear(width, height, bg_color, layer)
+        self._draw(frames, face_ids, shader, render, z_buffer)
         return render
 
-    def flat_shading(self, bg_color, ambient_light, time):
-        self.camera.set_time(time)
-
-        # Static color components
-        light_world_pos = self.light.transform.apply_to_point(np.array([0.0, 0.0, 0.0]), time)
-        camera_world_pos = self.camera.transform.apply_to_point(np.array([0.0, 0.0, 0.0]), time)
-
-        render = np.full((self.screen.width, self.screen.height, 3), bg_color)
-        z_buffer = np.full((self.screen.width, self.screen.height), 2.0)
+    # Returns the (width, height) z-buffer of the last frame rendered at this size, screen space depth per pixel
+    # and 2.0 where nothing was drawn, or None if there is none. Like the frame, it is overwritten by the next one.
+    def depth_buffer(self, width=None, height=None):
+        width = self.screen.width if width is None else width
+        height = self.screen.height if height is None else height
+        if self.tiles is not None:
+            return self.tiles.depth(width, height)
+        buffers = self.buffers.retained(width, height)
+        return None if buffers is None else buffers[1]
+
+    # Stops the tile worker processes, if any, and frees the frame buffers and caches
+    def close(self):
+        self.buffers.release()
+        self._static_frames = {}
+        self._static_layers = {}
+        self._last_frame = None
+        if self.tiles is not None:
+            self.tiles.close()
+
+    # Rasterizes and shades face_ids[i] of every frames[i] into the render and z_buffer of a frame,
+    # only inside the display rect (x0, x1, y0, y1) if given
+    def _draw(self, frames, face_ids, shader, render, z_buffer, rect=None):
+        width, height = z_buffer.shape
+
+        # Front to back order lets the hierarchical z-buffer reject hidden faces early, only useful with a z-test
+        occlusion_culling = self.occlusion_culling and shader.depth_tested
+        draw_list = front_to_back(frames, face_ids) if occlusion_culling else list(enumerate(face_ids))
+        hiz = HierarchicalZ(z_buffer, rect) if occlusion_culling else None
+
+        # The compiled kernel only fills G-buffers, which shade to the same frame as forward rendering
+        if self.deferred or (self.jit and raster_jit.available):
+            # A geometry pass fills a G-buffer with the nearest face of every pixel,
+            # then shading runs once per visible pixel, vectorized over the whole screen for each mesh
+            x0, x1, y0, y1 = (0, width - 1, 0, height - 1) if rect is None else rect
+            gbuffer = GBuffer(x1 - x0 + 1, y1 - y0 + 1, x0, y0, depth=z_buffer)
+            gbuffer.rasterize(frames, draw_list, width, height, shader.depth_tested, hiz, self.scanline, self.jit)
+            gbuffer.resolve(render, frames, shader)
+        else:
+            rasterize(ColorTarget(render, shader), z_buffer, frames, draw_list, width, height, shader.depth_tested,
+                      rect, hiz, self.scanline)
+
+    # Returns the (color, depth) layer of the frames of static meshes, rendered again only when the view,
+    # the light, the meshes, their geometry, their materials or the render settings change.
+    # One layer is kept per frame size, so previews at other resolutions don't replace it.
+    # The key holds the geometry itself rather than its id, which a new geometry could reuse once the old one is gone.
+    def _static_layer(self, frames, render_algorithm, bg_color, ambient_light, time, width, height):
+        key = (render_algorithm, np.asarray(bg_color).tobytes(), np.asarray(ambient_light).tobytes(), width, height,
+               self.buffers.color_dtype, self.buffers.depth_dtype,
+               self.camera.view_projection_matrix().tobytes(),
+               self.light.transform.transformation_matrix(time).tobytes(),
+               self.light.intensity, np.asarray(self.light.color).tobytes(),
+               tuple((id(frame.mesh), frame.geometry, frame.model_matrix.tobytes(), _material(frame.mesh))
+                     for frame in frames))
+        cached = self._static_layers.get((width, height))
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        shader = self._shader(render_algorithm, frames, ambient_light, time)
+        render = np.empty((width, height, 3), dtype=self.buffers.color_dtype)
+        render[...] = bg_color
+        z_buffer = np.full((width, height), 2.0, dtype=self.buffers.depth_dtype)
+        self._draw(frames, self._visible_faces(frames, shader), shader, render, z_buffer)
+        self._static_layers[(width, height)] = (key, (render, z_buffer))
+        return render, z_buffer
+
+    # Transforms and projects every mesh in view for this frame at its level of detail,
+    # see vertex_stage.TransformedMesh. Meshs drawing the same geometry are transformed together.
+    def _vertex_stage(self, time, width, height):
+        levels = []
         for mesh in self.meshs:
-            for face, normal in zip(mesh.faces, mesh.normals):
-                normal = mesh.transform.apply_to_normal(_normalize(normal), time)
-                # Normal culling
-                if np.dot(normal, self.camera.view_dir()) > 0:
-                    continue
-
-                # Calculate Per-Face color
-                face_world_pos = mesh.transform.apply_to_point(mesh.verts[face[0]], time) + \
-                                 mesh.transform.apply_to_point(mesh.verts[face[1]], time) + \
-                                 mesh.transform.apply_to_point(mesh.verts[face[2]], time)
-                face_world_pos = face_world_pos / 3.0
-                l = (light_world_pos - face_world_pos).flatten()
-                v = (camera_world_pos - face_world_pos).flatten()
-                h = _normalize(l + v)
-                cos = max(0, np.dot(_normalize(l), normal))
-
-                irradiance = self.light.intensity * cos / pow(_magnitude(l), 2) * self.light.color
-                diffuse = mesh.kd / math.pi * mesh.diffuse_color
-                specular = mesh.ks * mesh.specular_color * math.pow(max(0, np.dot(normal, h)), mesh.ke)
-                dynamic = np.array([(diffuse[0] + specular[0]) * irradiance[0],
-                                    (diffuse[1] + specular[1]) * irradiance[1],
-                                    (diffuse[2] + specular[2]) * irradiance[2]])
-                color = dynamic + mesh.ka * np.array(ambient_light)
-                color_int = np.array([int(color[0] * 255), int(color[1] * 255), int(color[2] * 255)])
-
-                # Get verts in screen space
-                verts = np.array(
-                    [self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[0]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[1]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[2]], time))]
-                )
-
-                # Get the bounds of the face in screen space
-                low = np.array(verts[0])
-                high = np.array(verts[0])
-                for vert in verts:
-                    for i in range(3):
-                        low[i] = min(low[i], vert[i])
-                        high[i] = max(high[i], vert[i])
-
-                # Get the bounds in display space
-                dis_low = _screen_to_display(low, self.screen.width, self.screen.height)
-                dis_high = _screen_to_display(high, self.screen.width, self.screen.height)
-                dis_low[0] = max(0, dis_low[0])
-                dis_low[2] = max(0, dis_low[2])
-                dis_low[0] = min(self.screen.width-1, dis_low[0])
-                dis_low[2] = min(self.screen.height-1, dis_low[2])
-                dis_high[0] = max(0, dis_high[0])
-                dis_high[2] = max(0, dis_high[2])
-                dis_high[0] = min(self.screen.width-1, dis_high[0])
-                dis_high[2] = min(self.screen.height-1, dis_high[2])
-
-                # Iterate through displayed pixels
-                for i in range(dis_high[0] - dis_low[0] + 1):
-                    for j in range(dis_high[2] - dis_low[2] + 1):
-                        # Get barycentric coordinates: bc = [alpha, beta, gamma]
-                        p = np.array([dis_low[0] + i, dis_low[2] + j], dtype=int)
-                        a = np.array([verts[0, 0], verts[0, 2]], dtype=float)
-                        b = np.array([verts[1, 0], verts[1, 2]], dtype=float)
-                        c = np.array([verts[2, 0], verts[2, 2]], dtype=float)
-                        p2 = _display_to_screen_bc(p, self.screen.width, self.screen.height)
-                        bc = _bc_coords(a, b, c, p2)
-
-                        if not _bary_in_range(bc[0], bc[1], bc[2]):
-                            continue
-
-                        # Check y in screen space against z-buffer
-                        py = bc[0] * verts[0, 1] + bc[1] * verts[1, 1] + bc[2] * verts[2, 1]
-                        if -1 > py or py > 1 or z_buffer[p[0], p[1]] < py:
-                            continue
-                        z_buffer[p[0], p[1]] = py
-
-                        # Add pixel to render buffer
-                        render[p[0], p[1]] = color_int
-                # If going for performance, remove following line, else this is more fun to watch
-                # self.screen.draw(render)
-        return render
-
-    def phong_shading(self, bg_color, ambient_light, time):
-        self.camera.set_time(time)
+            model = mesh.transform.transformation_matrix(time)
+            if self.frustum_culling and bounds_outside(mesh.bounds, model, self.camera):
+                continue
+            levels.append(lod.select_level(mesh, model, self.camera, width, height, self.lod_faces_per_pixel))
+
+        instances = {}
+        for level in levels:
+            if not (self.static_caching and level.transform.is_static()):
+                instances.setdefault(id(level.geometry), []).append(level)
+        transformed = {}
+        for meshs in instances.values():
+            transformed.update(zip(meshs, transform_instances(meshs, self.camera, time)))
+        return [transformed[level] if level in transformed else self._transformed_mesh(level, time)
+                for level in levels]
+
+    # TransformedMesh of mesh for this frame. A static mesh reuses its last one while its geometry and model matrix
+    # are unchanged, whole if the camera didn't move either, otherwise just the world space arrays.
+    def _transformed_mesh(self, mesh, time):
+        if not (self.static_caching and mesh.transform.is_static()):
+            return TransformedMesh(mesh, self.camera, time)
+
+        cached = self._static_frames.get(mesh)
+        if (cached is None or cached.geometry is not mesh.geometry
+                or not np.array_equal(cached.model_matrix, mesh.transform.transformation_matrix(time))):
+            frame = TransformedMesh(mesh, self.camera, time)
+        elif np.array_equal(cached.view_projection, self.camera.view_projection_matrix()):
+            frame = cached
+        else:
+            frame = TransformedMesh(mesh, self.camera, time, world=cached)
+        self._static_frames[mesh] = frame
+        return frame
 
+    # Returns the prepared shader of render_algorithm for this frame
+    def _shader(self, render_algorithm, frames, ambient_light, time):
         # Static color components
         light_world_pos = self.light.transform.apply_to_point(np.array([0.0, 0.0, 0.0]), time)
         camera_world_pos = self.camera.transform.apply_to_point(np.array([0.0, 0.0, 0.0]), time)
+        context = shading.ShadingContext(self.light, light_world_pos, camera_world_pos, ambient_light)
 
-        render = np.full((self.screen.width, self.screen.height, 3), bg_color)
-        z_buffer = np.full((self.screen.width, self.screen.height), 2.0)
-        for mesh in self.meshs:
-            for face, normal in zip(mesh.faces, mesh.normals):
-                normal = mesh.transform.apply_to_normal(_normalize(normal), time)
-                # Normal culling
-                if np.dot(normal, self.camera.view_dir()) > 0:
-                    continue
-
-                # Get verts in screen space
-                verts = np.array(
-                    [self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[0]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[1]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[2]], time))]
-                )
-                vert_normals = np.array(
-                    [mesh.transform.apply_to_normal(mesh.vertex_normals[face[0]], time),
-                     mesh.transform.apply_to_normal(mesh.vertex_normals[face[1]], time),
-                     mesh.transform.apply_to_normal(mesh.vertex_normals[face[2]], time)]
-                )
-
-                # Get the bounds of the face in screen space
-                low = np.array(verts[0])
-                high = np.array(verts[0])
-                for vert in verts:
-                    for i in range(3):
-                        low[i] = min(low[i], vert[i])
-                        high[i] = max(high[i], vert[i])
-
-                # Get the bounds in display space
-                dis_low = _screen_to_display(low, self.screen.width, self.screen.height)
-                dis_high = _screen_to_display(high, self.screen.width, self.screen.height)
-                dis_low[0] = max(0, dis_low[0])
-                dis_low[2] = max(0, dis_low[2])
-                dis_low[0] = min(self.screen.width-1, dis_low[0])
-                dis_low[2] = min(self.screen.height-1, dis_low[2])
-                dis_high[0] = max(0, dis_high[0])
-                dis_high[2] = max(0, dis_high[2])
-                dis_high[0] = min(self.screen.width-1, dis_high[0])
-                dis_high[2] = min(self.screen.height-1, dis_high[2])
-
-                # Iterate through displayed pixels
-                for i in range(dis_high[0] - dis_low[0] + 1):
-                    for j in range(dis_high[2] - dis_low[2] + 1):
-                        # Get barycentric coordinates: bc = [alpha, beta, gamma]
-                        p = np.array([dis_low[0] + i, dis_low[2] + j], dtype=int)
-                        a = np.array([verts[0, 0], verts[0, 2]], dtype=float)
-                        b = np.array([verts[1, 0], verts[1, 2]], dtype=float)
-                        c = np.array([verts[2, 0], verts[2, 2]], dtype=float)
-                        p2 = _display_to_screen_bc(p, self.screen.width, self.screen.height)
-                        bc = _bc_coords(a, b, c, p2)
-
-                        if not _bary_in_range(bc[0], bc[1], bc[2]):
-                            continue
-
-                        # Check y in screen space against z-buffer
-                        py = bc[0] * verts[0, 1] + bc[1] * verts[1, 1] + bc[2] * verts[2, 1]
-                        if -1 > py or py > 1 or z_buffer[p[0], p[1]] < py:
-                            continue
-                        z_buffer[p[0], p[1]] = py
-
-                        # Calculate color
-                        point_normal = _normalize(bc[0] * vert_normals[0] + bc[1] * vert_normals[1] + bc[2] * vert_normals[2])
-
-                        # Calculate Per-Face color
-                        point_world_pos = bc[0] * mesh.transform.apply_to_point(mesh.verts[face[0]], time) + \
-                                          bc[1] * mesh.transform.apply_to_point(mesh.verts[face[1]], time) + \
-                                          bc[2] * mesh.transform.apply_to_point(mesh.verts[face[2]], time)
-                        point_world_pos = point_world_pos.flatten()
-                        l = (light_world_pos - point_world_pos).flatten()
-                        v = (camera_world_pos - point_world_pos).flatten()
-                        l_mag = _magnitude(l)
-                        l = _normalize(l)  # Not 100% sure these normalizations are nessesary
-                        v = _normalize(v)
-                        h = _normalize(l + v)
-                        cos = max(0, np.dot(_normalize(l), point_normal))
-
-                        irradiance = self.light.intensity * cos / pow(l_mag, 2) * self.light.color
-                        diffuse = mesh.kd / math.pi * mesh.diffuse_color
-                        specular = mesh.ks * mesh.specular_color * math.pow(max(0, np.dot(point_normal, h)), mesh.ke)
-                        dynamic = np.array([(diffuse[0] + specular[0]) * irradiance[0],
-                                            (diffuse[1] + specular[1]) * irradiance[1],
-                                            (diffuse[2] + specular[2]) * irradiance[2]])
-                        color = dynamic + mesh.ka * np.array(ambient_light)
-                        color_int = np.array([int(color[0] * 255), int(color[1] * 255), int(color[2] * 255)])
-
-                        # Add pixel to render buffer
-                        render[p[0], p[1]] = color_int
-                # If going for performance, remove following line, else this is more fun to watch
-                # self.screen.draw(render)
-        return render
-
-    def barycentric_shading(self, bg_color, ambient_light, time):
-        self.camera.set_time(time)
-
-        render = np.full((self.screen.width, self.screen.height, 3), bg_color)
-        z_buffer = np.full((self.screen.width, self.screen.height), 2.0)
-        for mesh in self.meshs:
-            for face, normal in zip(mesh.faces, mesh.normals):
-                normal = mesh.transform.apply_to_normal(_normalize(normal), time)
-                # Normal culling
-                if np.dot(normal, self.camera.view_dir()) > 0:
-                    continue
-
-                # Get verts in screen space
-                verts = np.array(
-                    [self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[0]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[1]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[2]], time))]
-                )
-
-                # Get the bounds of the face in screen space
-                low = np.array(verts[0])
-                high = np.array(verts[0])
-                for vert in verts:
-                    for i in range(3):
-                        low[i] = min(low[i], vert[i])
-                        high[i] = max(high[i], vert[i])
-
-                # Get the bounds in display space
-                dis_low = _screen_to_display(low, self.screen.width, self.screen.height)
-                dis_high = _screen_to_display(high, self.screen.width, self.screen.height)
-                dis_low[0] = max(0, dis_low[0])
-                dis_low[2] = max(0, dis_low[2])
-                dis_low[0] = min(self.screen.width-1, dis_low[0])
-                dis_low[2] = min(self.screen.height-1, dis_low[2])
-                dis_high[0] = max(0, dis_high[0])
-                dis_high[2] = max(0, dis_high[2])
-                dis_high[0] = min(self.screen.width-1, dis_high[0])
-                dis_high[2] = min(self.screen.height-1, dis_high[2])
-
-                # Iterate through displayed pixels
-                for i in range(dis_high[0] - dis_low[0] + 1):
-                    for j in range(dis_high[2] - dis_low[2] + 1):
-                        # Get barycentric coordinates: bc = [alpha, beta, gamma]
-                        p = np.array([dis_low[0]+i, dis_low[2]+j], dtype=int)
-                        a = np.array([verts[0,0],verts[0,2]], dtype=float)
-                        b = np.array([verts[1,0],verts[1,2]], dtype=float)
-                        c = np.array([verts[2,0],verts[2,2]], dtype=float)
-                        p2 = _display_to_screen_bc(p, self.screen.width, self.screen.height)
-                        bc = _bc_coords(a, b, c, p2)
-
-                        if _bary_in_range(bc[0], bc[1], bc[2]):
-                            # Check y in screen space against z-buffer
-                            py = bc[0]*verts[0,1] + bc[1]*verts[1,1] + bc[2]*verts[2,1]
-                            if -1 > py or py > 1 or z_buffer[p[0], p[1]] < py:
-                                continue
-                            z_buffer[p[0], p[1]] = py
-
-                            # Add pixel to render buffer
-                            render[p[0], p[1]] = [int(bc[0] * 255), int(bc[1] * 255), int(bc[2] * 255)]
-                # If going for performance, remove following line, else this is more fun to watch
-                # self.screen.draw(render)
-        return render
-
-    def depth_shading(self, bg_color, ambient_light, time):
-        self.camera.set_time(time)
-
-        # Get shading scale
-        depth = np.array([1.0,-1.0])
-        for mesh in self.meshs:
-            for face in mesh.faces:
-                verts = np.array(
-                    [self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[0]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[1]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[2]], time))]
-                )
-                for vert in verts:
-                    depth[0] = min(depth[0], vert[1])
-                    depth[1] = max(depth[1], vert[1])
-        delta_depth = depth[1] - depth[0]
-
-        render = np.full((self.screen.width, self.screen.height, 3), bg_color)
-        z_buffer = np.full((self.screen.width, self.screen.height), 2.0)
-        for mesh in self.meshs:
-            for face, normal in zip(mesh.faces, mesh.normals):
-                normal = mesh.transform.apply_to_normal(_normalize(normal), time)
-                # Normal culling
-                if np.dot(normal, self.camera.view_dir()) > 0:
-                    continue
-
-                # Get verts in screen space
-                verts = np.array(
-                    [self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[0]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[1]], time)),
-                     self.camera.project_point(mesh.transform.apply_to_point(mesh.verts[face[2]], time))]
-                )
-
-                # Get the bounds of the face in screen space
-                low = np.array(verts[0])
-                high = np.array(verts[0])
-                for vert in verts:
-                    for i in range(3):
-                        low[i] = min(low[i], vert[i])
-                        high[i] = max(high[i], vert[i])
-
-                # Get the bounds in display space
-                dis_low = _screen_to_display(low, self.screen.width, self.screen.height)
-                dis_high = _screen_to_display(high, self.screen.width, self.screen.height)
-                dis_low[0] = max(0, dis_low[0])
-                dis_low[2] = max(0, dis_low[2])
-                dis_low[0] = min(self.screen.width-1, dis_low[0])
-                dis_low[2] = min(self.screen.height-1, dis_low[2])
-                dis_high[0] = max(0, dis_high[0])
-                dis_high[2] = max(0, dis_high[2])
-                dis_high[0] = min(self.screen.width-1, dis_high[0])
-                dis_high[2] = min(self.screen.height-1, dis_high[2])
-
-                # Iterate through displayed pixels
-                for i in range(dis_high[0] - dis_low[0] + 1):
-                    for j in range(dis_high[2] - dis_low[2] + 1):
-                        # Get barycentric coordinates: bc = [alpha, beta, gamma]
-                        p = np.array([dis_low[0] + i, dis_low[2] + j], dtype=int)
-                        a = np.array([verts[0, 0], verts[0, 2]], dtype=float)
-                        b = np.array([verts[1, 0], verts[1, 2]], dtype=float)
-                        c = np.array([verts[2, 0], verts[2, 2]], dtype=float)
-                        p2 = _display_to_screen_bc(p, self.screen.width, self.screen.height)
-                        bc = _bc_coords(a, b, c, p2)
-
-                        if _bary_in_range(bc[0], bc[1], bc[2]):
-                            # Check y in screen space against z-buffer
-                            py = bc[0] * verts[0, 1] + bc[1] * verts[1, 1] + bc[2] * verts[2, 1]
-                            if -1 > py or py > 1 or z_buffer[p[0], p[1]] < py:
-                                continue
-                            z_buffer[p[0], p[1]] = py
-
-                            # Add pixel to render buffer
-                            col = int((py - depth[0]) / delta_depth * 255)
-                            render[p[0], p[1]] = [col, col, col]
-                # If going for performance, remove following line, else this is more fun to watch
-                # self.screen.draw(render)
-        return render
-
-
-# Returns [->a, ->b, ->c]
-def _bc_coords(a, b, c, p):
-    v0 = b-a
-    v1 = c-a
-    v2 = p-a
-    d00 = np.dot(v0,v0)
-    d01 = np.dot(v0,v1)
-    d11 = np.dot(v1,v1)
-    d20 = np.dot(v2,v0)
-    d21 = np.dot(v2,v1)
-    denom = d00 * d11 - d01 * d01
-    v = (d11 * d20 - d01 * d21) / denom
-    w = (d00 * d21 - d01 * d20) / denom
-    u = 1.0-v-w
-    return np.array([u, v, w])
-
-
-def _screen_to_display(p, width, height):
-    ret = np.zeros(3, dtype=int)
-    ret[0] = int((p[0]/2 + 0.5) * width)
-    ret[2] = int((p[2]/2 + 0.5) * height)
-    return ret
-
-
-def _display_to_screen(p, width, height):
-    ret = np.zeros(3, dtype=float)
-    ret[0] = (2.0 * p[0] / width) - 1.0
-    ret[2] = (2.0 * p[2] / height) - 1.0
-    return ret
-
-
-def _display_to_screen_bc(p, width, height):
-    ret = np.zeros(2, dtype=float)
-    ret[0] = (2.0 * p[0] / width) - 1.0
-    ret[1] = (2.0 * p[1] / height) - 1.0
-    return ret
-
-
-def _bary_in_range(alpha, beta, gamma):
-    return (0 <= alpha <= 1) and (0 <= beta <= 1) and (0 <= gamma <= 1)
-
+        shader = _SHADERS[render_algorithm](context)
+        shader.prepare(frames)
+        return shader
 
-def _normalize(v):
-    n = np.linalg.norm(v)
-    if n == 0:
-        return v
-    return v / np.linalg.norm(v)
+    # Faces of every frame that get rasterized: the ones inside the view volume,
+    # with normal culling unless the shader draws back faces
+    def _visible_faces(self, frames, shader):
+        if not shader.cull_backfaces:
+            return [np.flatnonzero(~frame.outside) for frame in frames]
+        return [np.flatnonzero(~frame.outside & ~frame.backfaces(self.camera.view_dir())) for frame in frames]
 
 
-def _magnitude(v):
-    sum = 0.0
-    for axis in v:
-        sum+= pow(axis,2)
-    return math.sqrt(sum)
+# The material a mesh is shaded with, as part of a cache key
+def _material(mesh):
+    return (np.asarray(mesh.diffuse_color).tobytes(), np.asarray(mesh.specular_color).tobytes(),
+            mesh.ka, mesh.kd, mesh.ks, mesh.ke)
@@ -1,5 +1,18 @@
+import os
 import numpy as np
 import pygame
+from PIL import Image
+
+# Set to 1 to make create_screen return a HeadlessScreen, e.g. on machines without a display server
+HEADLESS_ENV = "RENDER_HEADLESS"
+
+
+# Returns a Screen, or a HeadlessScreen if headless is True.
+# headless=None decides from the RENDER_HEADLESS environment variable, so a script can be run either way.
+def create_screen(width: int, height: int, headless=None):
+    if headless is None:
+        headless = os.environ.get(HEADLESS_ENV, "0").lower() in ("1", "true", "yes")
+    return HeadlessScreen(width, height) if headless else Screen(width, height)
 
 
 class Screen:
@@ -36,14 +49,50 @@ class Screen:
 
     # enters the main event loop and prevents the window from closing right away.
     # The window should close when the pygame.QUIT event is triggered.
+    # Blocks on the next event instead of polling, so an open window uses no CPU. See viewer.Viewer for
+    # an interactive preview of a scene.
     def show(self):
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
+        while pygame.event.wait().type != pygame.QUIT:
+            pass
 
         pygame.quit()
 
     def save_screen(self, file_path):
         pygame.image.save(self.display, file_path)
+
+    # Only the size survives pickling, so a copy sent to another process has no display and can't draw
+    def __getstate__(self):
+        return {'width': self.width, 'height': self.height, 'display': None}
+
+
+# Offscreen Screen for batch rendering without a display: the same interface, backed by the last drawn buffer.
+# draw keeps a reference to the buffer instead of copying it to a window.
+class HeadlessScreen:
+    def __init__(self, width: int, height: int):
+        if width <= 0 or height <= 0:
+            raise ValueError("Width or height is 0 or less!")
+        self.width = width
+        self.height = height
+        self.buffer = np.zeros((width, height, 3), dtype=np.uint8)
+
+    def ratio(self):
+        return self.width / self.height
+
+    def draw(self, buffer: np.ndarray):
+        if (self.width, self.height, 3) != buffer.shape:
+            raise ValueError("Input buffer is of invalid shape!")
+        self.buffer = buffer
+
+    # There is no window to keep open
+    def show(self):
+        pass
+
+    # Saves the last drawn buffer as an image, oriented like Screen.save_screen
+    def save_screen(self, file_path):
+        Image.fromarray(to_image(self.buffer)).save(file_path)
+
+
+# A (width, height, 3) frame buffer as a (height, width, 3) uint8 image array, top row first,
+# the way Screen shows it
+def to_image(buffer):
+    return np.clip(np.fliplr(buffer), 0, 255).astype(np.uint8).transpose(1, 0, 2)
@@ -0,0 +1,163 @@
+import math
+import numpy as np
+
+
+# Per-frame values shared by every shaded pixel
+class ShadingContext:
+    def __init__(self, light, light_world_pos, camera_world_pos, ambient_light):
+        self.light = light
+        self.light_world_pos = light_world_pos
+        self.camera_world_pos = camera_world_pos
+        self.ambient_light = np.array(ambient_light)
+
+
+# Per-pixel shader run by the rasterization core, one subclass per RenderAlgorithm.
+# The core calls prepare once per frame, then shade for batches of pixels that passed coverage and the z-test,
+# either one face at a time (forward) or one mesh at a time from a G-buffer (deferred and tiled).
+class Shader:
+    cull_backfaces = True
+    depth_tested = True
+    # A mesh's pixels only depend on the mesh, so meshes can be rendered in separate layers and composited
+    layer_cacheable = True
+
+    def __init__(self, context):
+        self.context = context
+
+    # frames are this frame's TransformedMeshs, indexed by mesh_id in shade
+    def prepare(self, frames):
+        pass
+
+    # Returns (n, 3) int colors for pixels of frames[mesh_id] showing faces face_ids (n,), with barycentric
+    # coordinates bc (n, 3) and screen space depth (n,)
+    def shade(self, mesh_id, frame, face_ids, bc, depth):
+        raise NotImplementedError
+
+
+# NONE: every face, front or back, is drawn black
+class NoneShader(Shader):
+    cull_backfaces = False
+    depth_tested = False
+
+    def shade(self, mesh_id, frame, face_ids, bc, depth):
+        return np.zeros((len(face_ids), 3), dtype=int)
+
+
+class FlatShader(Shader):
+    def prepare(self, frames):
+        self.face_colors = [flat_colors(frame, self.context) for frame in frames]
+
+    def shade(self, mesh_id, frame, face_ids, bc, depth):
+        return self.face_colors[mesh_id][face_ids]
+
+
+class PhongShader(Shader):
+    def shade(self, mesh_id, frame, face_ids, bc, depth):
+        face_verts = frame.faces[face_ids]
+        point_normals = interpolate(bc, frame.vertex_normals[face_verts])
+        point_world_pos = interpolate(bc, frame.world_verts[face_verts])
+        return phong_colors(point_normals, point_world_pos, frame.mesh, self.context)
+
+
+# GOURAUD: phong lighting once per vertex of the mesh, colors are interpolated across each face
+class GouraudShader(Shader):
+    def prepare(self, frames):
+        self.vertex_colors = [phong_lighting(frame.vertex_normals, frame.world_verts, frame.mesh, self.context) * 255
+                              for frame in frames]
+
+    def shade(self, mesh_id, frame, face_ids, bc, depth):
+        return interpolate(bc, self.vertex_colors[mesh_id][frame.faces[face_ids]]).astype(int)
+
+
+class BarycentricShader(Shader):
+    def shade(self, mesh_id, frame, face_ids, bc, depth):
+        return (bc * 255).astype(int)
+
+
+# DEPTH: a gradient from the nearest (black) to the furthest (white) screen space depth of the scene
+class DepthShader(Shader):
+    # The gradient spans every mesh of the frame
+    layer_cacheable = False
+
+    def prepare(self, frames):
+        self.depth_range = depth_range(frames)
+
+    def shade(self, mesh_id, frame, face_ids, bc, depth):
+        low, high = self.depth_range
+        col = ((depth - low) / (high - low) * 255).astype(int)
+        return np.repeat(col[:, np.newaxis], 3, axis=1)
+
+
+# Returns [nearest, furthest] screen space depth over every face of every frame inside the view volume
+def depth_range(frames):
+    depth = np.array([1.0,-1.0])
+    for frame in frames:
+        ids = np.flatnonzero(~frame.outside)
+        if len(ids) == 0:
+            continue
+        low, high = frame.screen_bounds(ids)
+        depth[0] = min(depth[0], low[:, 1].min())
+        depth[1] = max(depth[1], high[:, 1].max())
+    return depth
+
+
+# Flat lighting at the center of every face of a TransformedMesh. Returns (faces, 3) int colors.
+def flat_colors(frame, context):
+    mesh = frame.mesh
+    light = context.light
+    normals = frame.face_normals
+    face_world_verts = frame.world_verts[frame.faces]
+    face_world_pos = face_world_verts[:, 0] + face_world_verts[:, 1] + face_world_verts[:, 2]
+    face_world_pos = face_world_pos / 3.0
+    l = context.light_world_pos - face_world_pos
+    v = context.camera_world_pos - face_world_pos
+    h = normalize_rows(l + v)
+    cos = np.maximum(0, np.sum(normalize_rows(l) * normals, axis=1))
+
+    irradiance = (light.intensity * cos / np.sum(l * l, axis=1))[:, np.newaxis] * light.color
+    diffuse = mesh.kd / math.pi * mesh.diffuse_color
+    specular = mesh.ks * mesh.specular_color * \
+        np.power(np.maximum(0, np.sum(normals * h, axis=1)), mesh.ke)[:, np.newaxis]
+    dynamic = (diffuse + specular) * irradiance
+    color = dynamic + mesh.ka * context.ambient_light
+    return (color * 255).astype(int)
+
+
+# Phong lighting for n points at once, normals and world_pos are (n, 3). Returns (n, 3) int colors.
+def phong_colors(normals, world_pos, mesh, context):
+    return (phong_lighting(normals, world_pos, mesh, context) * 255).astype(int)
+
+
+# phong_colors as (n, 3) float colors, 1.0 is full intensity
+def phong_lighting(normals, world_pos, mesh, context):
+    light = context.light
+    normals = normalize_rows(normals)
+    l = context.light_world_pos - world_pos
+    v = context.camera_world_pos - world_pos
+    l_mag = np.sqrt(np.sum(l * l, axis=1))
+    l = normalize_rows(l)  # Not 100% sure these normalizations are nessesary
+    v = normalize_rows(v)
+    h = normalize_rows(l + v)
+    cos = np.maximum(0, np.sum(normalize_rows(l) * normals, axis=1))
+
+    irradiance = (light.intensity * cos / np.power(l_mag, 2))[:, np.newaxis] * light.color
+    diffuse = mesh.kd / math.pi * mesh.diffuse_color
+    specular = mesh.ks * mesh.specular_color * \
+        np.power(np.maximum(0, np.sum(normals * h, axis=1)), mesh.ke)[:, np.newaxis]
+    dynamic = (diffuse + specular) * irradiance
+    return dynamic + mesh.ka * context.ambient_light
+
+
+# Barycentric interpolation, bc is (n, 3) and values is (3, k) or per point (n, 3, k)
+def interpolate(bc, values):
+    values = np.asarray(values)
+    if values.ndim == 2:
+        return bc[:, 0:1] * values[0] + bc[:, 1:2] * values[1] + bc[:, 2:3] * values[2]
+    return bc[:, 0:1] * values[:, 0] + bc[:, 1:2] * values[:, 1] + bc[:, 2:3] * values[:, 2]
+
+
+# Scales the rows of the (n, 3) vectors v to unit length, zero rows stay zero
+def normalize_rows(v):
+    v = np.asarray(v, dtype=float).reshape(-1, 3)
+    n = np.linalg.norm(v, axis=1)
+    n[n == 0] = 1.0
+    return v / n[:, np.newaxis]
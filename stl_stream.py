@@ -0,0 +1,52 @@
+import os
+import numpy as np
+import welding
+
+# Triangles read and welded at a time, about 13 MB of a binary STL
+CHUNK_TRIANGLES = 1 << 18
+
+# A triangle of a binary STL: its normal, its three corners and an unused attribute
+_TRIANGLE = np.dtype([('normal', '<f4', (3,)), ('vectors', '<f4', (3, 3)), ('attr', '<u2')])
+_HEADER_SIZE = 84
+
+
+# True if the file at stl_path is a binary STL. ASCII files may start with anything, so a file is binary
+# if its size matches the triangle count in its header.
+def is_binary(stl_path):
+    with open(stl_path, 'rb') as file:
+        header = file.read(_HEADER_SIZE)
+    if len(header) < _HEADER_SIZE:
+        return False
+    count = int(np.frombuffer(header[80:84], dtype='<u4')[0])
+    return os.path.getsize(stl_path) == _HEADER_SIZE + count * _TRIANGLE.itemsize
+
+
+# Loads and welds a binary STL in chunks of chunk_triangles triangles read straight from a memory map,
+# so memory holds the resulting arrays and one chunk rather than the whole file, see welding.ChunkedWeld.
+# Normals are computed from the corners like numpy-stl does. tolerance: see welding.weld.
+# Returns (verts, faces, normals, vertex_normals, bounds) as Mesh.from_stl would build them.
+def load(stl_path, tolerance=0.0, chunk_triangles=CHUNK_TRIANGLES):
+    count = (os.path.getsize(stl_path) - _HEADER_SIZE) // _TRIANGLE.itemsize
+    if count == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=int), np.zeros((0, 3), dtype=np.float32), \
+            np.zeros((0, 3)), ()
+    triangles = np.memmap(stl_path, dtype=_TRIANGLE, mode='r', offset=_HEADER_SIZE, shape=(count,))
+    chunks = [slice(start, min(start + chunk_triangles, count)) for start in range(0, count, chunk_triangles)]
+
+    weld = welding.ChunkedWeld(tolerance)
+    faces = np.empty((count, 3), dtype=int)
+    normals = np.empty((count, 3), dtype=np.float32)
+    low = np.full(3, np.inf, dtype=np.float32)
+    high = np.full(3, -np.inf, dtype=np.float32)
+    for chunk in chunks:
+        vectors = np.array(triangles['vectors'][chunk])
+        normals[chunk] = np.cross(vectors[:, 1] - vectors[:, 0], vectors[:, 2] - vectors[:, 0])
+        faces[chunk] = weld.add(vectors)
+        low = np.minimum(low, vectors.min(axis=(0, 1)))
+        high = np.maximum(high, vectors.max(axis=(0, 1)))
+    del triangles
+
+    verts = weld.finish()
+    for i, chunk in enumerate(chunks):
+        faces[chunk] = weld.renumber(i, faces[chunk])
+    return verts, faces, normals, welding.vertex_normals(faces, normals, len(verts)), (tuple(low), tuple(high))
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+
+# Keeps test meshes out of the on-disk mesh cache
+@pytest.fixture(autouse=True)
+def no_mesh_cache(monkeypatch):
+    monkeypatch.setenv("MESH_CACHE_DIR", "")
+
+
+# A small scene of the bundled meshes: a moving sphere in front of a static cube, seen by a static camera
+@pytest.fixture
+def scene():
+    from camera import PerspectiveCamera
+    from light import PointLight
+    from mesh import Mesh
+    from screen import HeadlessScreen
+    import animation_curve as curve
+
+    def make(**renderer_args):
+        from renderer import Renderer
+        camera = PerspectiveCamera(-1.0, 1.0, -1.0, 1.0, 1.0, 10)
+        camera.transform.set_position(0, -2.5, 1)
+        sphere = Mesh.from_stl(os.path.join(ROOT, "unit_sphere.stl"), [1.0, 0.0, 1.0], [1.0, 1.0, 1.0],
+                               0.05, 1.0, 0.5, 1000)
+        sphere.transform.set_position(curve.Curve([[-1.0, 0.0, curve.CurveType.LINEAR, 2],
+                                                   [1.0, 2.0, curve.CurveType.HOLD, 2]]), 0.0, 0.5)
+        cube = Mesh.from_stl(os.path.join(ROOT, "unit_cube.stl"), [0.0, 1.0, 0.0], [1.0, 1.0, 1.0],
+                             0.05, 1.0, 0.5, 1000)
+        cube.transform.set_position(1.0, 1.0, 0.5)
+        cube.transform.set_rotation(20, 30, 10)
+        light = PointLight(50.0, np.array([1, 1, 1]))
+        light.transform.set_position(0, -5, 5)
+        return Renderer(HeadlessScreen(48, 40), camera, [sphere, cube], light, **renderer_args)
+    return make
@@ -0,0 +1,86 @@
+import os
+import numpy as np
+import pytest
+import animation_runner
+import frame_store
+from frame_store import FrameStore
+from renderer import RenderAlgorithm
+
+WIDTH = 6
+HEIGHT = 4
+
+
+def _frame(value):
+    return np.full((WIDTH, HEIGHT, 3), value, dtype=np.uint8)
+
+
+# A store at path with frames 0 and 2 of 4 written
+def _partial_store(path, key="scene", depth=True):
+    store = FrameStore(path, 4, WIDTH, HEIGHT, depth, key)
+    for i in (0, 2):
+        store.write(i, _frame(i + 1), np.full((WIDTH, HEIGHT), 0.5))
+    store.flush()
+    return store
+
+
+def test_resume_keeps_written_frames(tmp_path):
+    path = str(tmp_path / "frames")
+    _partial_store(path)
+    store = FrameStore(path, 4, WIDTH, HEIGHT, True, "scene", resume=True)
+    assert list(store.missing()) == [1, 3]
+    assert (store.color[2] == 3).all()
+    assert (store.depth[0] == 0.5).all()
+
+
+@pytest.mark.parametrize("changes", [
+    dict(resume=False),
+    dict(key="other scene"),
+    dict(frames=5),
+    dict(width=WIDTH + 2),
+    dict(depth=True),
+])
+def test_store_starts_over(tmp_path, changes):
+    path = str(tmp_path / "frames")
+    _partial_store(path, depth=False)
+    args = dict(frames=4, width=WIDTH, height=HEIGHT, depth=False, key="scene", resume=True)
+    args.update(changes)
+    store = FrameStore(path, **args)
+    assert list(store.missing()) == list(range(args["frames"]))
+    assert not store.color.any()
+
+
+def test_store_without_depth_removes_old_depth(tmp_path):
+    path = str(tmp_path / "frames")
+    _partial_store(path, depth=True)
+    FrameStore(path, 4, WIDTH, HEIGHT, False, "scene", resume=True)
+    assert not os.path.exists(path + "_depth.npy")
+    colors, depths, done = frame_store.load(path)
+    assert depths is None
+    assert list(done) == [True, False, True, False]
+
+
+def test_scene_key_follows_scene(scene):
+    renderer = scene()
+    args = (RenderAlgorithm.PHONG, [80, 80, 80], [0.4, 0.4, 0.4], 4)
+    key = animation_runner._scene_key(renderer, *args)
+    assert animation_runner._scene_key(scene(), *args) == key
+    renderer.meshs[1].transform.x_pos = 0.3
+    assert animation_runner._scene_key(renderer, *args) != key
+    assert animation_runner._scene_key(scene(), RenderAlgorithm.FLAT, *args[1:]) != key
+
+
+def test_run_animation_resumes_same_scene(scene, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    renderer = scene()
+    args = (RenderAlgorithm.FLAT, [80, 80, 80], [0.4, 0.4, 0.4], 2, 1.5)
+    animation_runner.run_animation(renderer, *args, output="frames")
+    rendered = []
+    render_frame = renderer.render_frame
+    monkeypatch.setattr(renderer, "render_frame", lambda *a: rendered.append(a) or render_frame(*a))
+
+    animation_runner.run_animation(renderer, *args, output="frames", resume=True)
+    assert rendered == []
+    renderer.meshs[0].ka = 0.5
+    animation_runner.run_animation(renderer, *args, output="frames", resume=True)
+    assert len(rendered) == 3
+    assert frame_store.load("animations/frames")[2].all()
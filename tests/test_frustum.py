@@ -0,0 +1,49 @@
+import numpy as np
+from frustum import NEAR, clip_near, to_screen
+
+FACES = np.array([[0, 1, 2]])
+
+
+# Clip space face whose verts have the given distances w + y to the near plane
+def _face(*distances):
+    clip = np.array([[-0.5, 0.0, -0.5, 2.0], [0.5, 0.0, -0.5, 2.0], [0.0, 0.0, 0.5, 2.0]])
+    clip[:, NEAR] = np.array(distances) - clip[:, 3]
+    return clip
+
+
+def _check_triangles(clip, triangles):
+    for verts, bary in triangles:
+        assert np.allclose(bary.sum(axis=1), 1)
+        corners = bary @ clip
+        assert (corners[:, 3] + corners[:, NEAR] >= -1e-12).all()
+        assert np.allclose(verts, to_screen(corners))
+
+
+def test_face_in_front_is_kept():
+    clip = _face(1.0, 2.0, 3.0)
+    triangles = clip_near(clip, FACES, [0])[0]
+    assert len(triangles) == 1
+    verts, bary = triangles[0]
+    assert np.allclose(verts, to_screen(clip))
+    assert np.array_equal(bary, np.identity(3))
+
+
+def test_face_behind_is_dropped():
+    assert clip_near(_face(-1.0, -2.0, -0.5), FACES, [0]) == {0: []}
+
+
+def test_one_vert_behind_leaves_two_triangles():
+    clip = _face(1.0, -1.0, 2.0)
+    triangles = clip_near(clip, FACES, [0])[0]
+    assert len(triangles) == 2
+    _check_triangles(clip, triangles)
+
+
+def test_two_verts_behind_leave_one_triangle():
+    clip = _face(-1.0, 3.0, -1.0)
+    triangles = clip_near(clip, FACES, [0])[0]
+    assert len(triangles) == 1
+    _check_triangles(clip, triangles)
+    # The two new verts lie on the near plane
+    corners = triangles[0][1] @ clip
+    assert np.isclose(corners[:, 3] + corners[:, NEAR], 0).sum() == 2
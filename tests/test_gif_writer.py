@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence
+from gif_writer import GifWriter
+
+
+# Palette index frames of a square moving over a still background, with one frame repeated
+def _frames(colors):
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, colors - 1, (30, 40)).astype(np.uint8)
+    frames = []
+    for x in (2, 5, 5, 9):
+        frame = background.copy()
+        frame[10:16, x:x + 6] = colors - 1
+        frames.append(frame)
+    return frames
+
+
+def _decoded(file_path):
+    with Image.open(file_path) as gif:
+        return [(np.asarray(frame.convert("RGB")), gif.dispose_extent) for frame in ImageSequence.Iterator(gif)]
+
+
+@pytest.mark.parametrize("colors", [16, 256])
+def test_delta_frames_decode_to_full_frames(tmp_path, colors):
+    palette = np.random.default_rng(1).integers(0, 256, (colors, 3)).astype(np.uint8)
+    frames = _frames(colors)
+    file_path = str(tmp_path / "delta.gif")
+    with GifWriter(file_path, 100, palette=palette) as gif:
+        for frame in frames:
+            gif.write(frame)
+
+    decoded = _decoded(file_path)
+    assert len(decoded) == len(frames)
+    for frame, (image, _) in zip(frames, decoded):
+        assert np.array_equal(image, palette[frame])
+    # Only the moved square is stored after the first frame, a repeated frame keeps a single pixel
+    extents = [extent for _, extent in decoded]
+    assert extents[0] == (0, 0, 40, 30)
+    assert extents[1] == (2, 10, 11, 16)
+    assert extents[2] == (0, 0, 1, 1)
+    assert extents[3] == (5, 10, 15, 16)
+
+
+def test_delta_frames_are_smaller(tmp_path):
+    palette = np.random.default_rng(1).integers(0, 256, (16, 3)).astype(np.uint8)
+    sizes = []
+    for delta in (False, True):
+        file_path = tmp_path / f"{delta}.gif"
+        with GifWriter(str(file_path), 100, palette=palette, delta=delta) as gif:
+            for frame in _frames(16):
+                gif.write(frame)
+        sizes.append(file_path.stat().st_size)
+    assert sizes[1] < sizes[0]
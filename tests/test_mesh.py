@@ -0,0 +1,68 @@
+import os
+import numpy as np
+from mesh import Mesh
+from transform import Transform
+
+SUZANNE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "suzanne.stl")
+
+
+def _suzanne(lod_levels=2, cache=True):
+    return Mesh.from_stl(SUZANNE, [0.0, 0.0, 1.0], [1.0, 1.0, 1.0], 0.05, 1.0, 0.5, 100, lod_levels=lod_levels,
+                         cache=cache)
+
+
+def test_instances_share_geometry():
+    mesh = _suzanne()
+    instance = mesh.instance([1.0, 0.0, 0.0], [1.0, 1.0, 1.0], 0.1, 0.8, 0.2, 10)
+    assert instance.geometry is mesh.geometry
+    assert len(instance.lods) == len(mesh.lods) == 2
+    assert instance.lods[0].geometry is mesh.lods[0].geometry
+    assert np.array_equal(instance.lods[0].diffuse_color, [1.0, 0.0, 0.0])
+
+
+def test_lods_follow_material_and_transform():
+    mesh = _suzanne()
+    levels = mesh.lods
+    mesh.diffuse_color = np.array([0.5, 0.5, 0.0])
+    mesh.ks = 0.9
+    mesh.transform = Transform()
+    assert mesh.lods is levels
+    for level in mesh.lods:
+        assert level.diffuse_color is mesh.diffuse_color
+        assert level.ks == 0.9
+        assert level.transform is mesh.transform
+
+
+def test_rebuilt_lods_reach_every_instance():
+    # Not shared with other tests loading the file
+    mesh = _suzanne(lod_levels=0, cache=False)
+    instance = mesh.instance([1.0, 0.0, 0.0], [1.0, 1.0, 1.0], 0.1, 0.8, 0.2, 10)
+    assert instance.lods == []
+    mesh.geometry.build_lods(1)
+    assert len(instance.lods) == 1
+    assert len(instance.lods[0].faces) < len(instance.faces)
+
+
+# An entry without one of the arrays every geometry has is a miss, and is replaced by a complete one
+def test_incomplete_cache_entry_is_a_miss(monkeypatch, tmp_path):
+    import mesh_cache
+    monkeypatch.setenv("MESH_CACHE_DIR", str(tmp_path))
+    expected = _suzanne(lod_levels=1, cache=False)
+    key = mesh_cache.key(SUZANNE, (0.0, 1))
+    arrays = expected.geometry._arrays()
+    del arrays['vertex_normals']
+    mesh_cache.store(key, arrays)
+
+    mesh = _suzanne(lod_levels=1, cache=True)
+    assert np.array_equal(mesh.vertex_normals, expected.vertex_normals)
+    assert len(mesh.lods) == 1
+    assert set(mesh_cache.load(key)) == set(expected.geometry._arrays())
+
+
+# Levels of detail weight their vertex normals by face area, like the full mesh
+def test_lod_normals_match_full_mesh():
+    import lod
+    mesh = _suzanne(lod_levels=0, cache=False)
+    face_normals, vertex_normals = lod.normals(mesh.verts, mesh.faces)
+    # The STL normals of the full mesh are float32
+    assert np.allclose(vertex_normals, mesh.vertex_normals, atol=1e-6)
@@ -0,0 +1,31 @@
+import numpy as np
+import palette
+
+
+def _image(colors, seed=0):
+    rng = np.random.default_rng(seed)
+    return colors[rng.integers(0, len(colors), (20, 30))]
+
+
+def test_exact_palette_is_lossless():
+    # Colors a LUT_BITS table can't tell apart
+    colors = np.array([[100, 100, 100], [101, 100, 100], [100, 101, 103], [7, 200, 31], [0, 0, 0]], dtype=np.uint8)
+    image = _image(colors)
+    colors_found = palette.build_palette([image])
+    assert len(colors_found) == len(colors)
+    indices = palette.quantize(image, palette.color_lut(colors_found))
+    assert indices.dtype == np.uint8
+    assert np.array_equal(colors_found[indices], image)
+
+
+def test_reduced_palette_maps_to_nearest_color():
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, (40, 40, 3)).astype(np.uint8)
+    colors = palette.build_palette([image], colors=16)
+    assert len(colors) <= 16
+    lut = palette.color_lut(colors)
+    # Its own colors map to themselves, others to a close palette color
+    assert np.array_equal(palette.quantize(colors[np.newaxis], lut)[0], np.arange(len(colors)))
+    error = np.abs(colors[palette.quantize(image, lut)].astype(int) - image).max(axis=2)
+    nearest = np.sqrt(((image[:, :, np.newaxis, :].astype(int) - colors.astype(int)) ** 2).sum(axis=3)).min(axis=2)
+    assert (error <= nearest + (1 << (8 - palette.LUT_BITS))).all()
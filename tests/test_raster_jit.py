@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from frustum import clip_near
+from gbuffer import GBuffer
+from rasterizer import rasterize
+import raster_jit
+
+WIDTH = 48
+HEIGHT = 40
+
+pytestmark = pytest.mark.skipif(not raster_jit.available, reason="needs numba")
+
+
+# Stands in for vertex_stage.TransformedMesh, with the clipped triangles of the faces crossing the near plane
+class _Frame:
+    def __init__(self, screen_verts, faces, clipped=None):
+        self.screen_verts = screen_verts
+        self.faces = faces
+        self.clipped = clipped or {}
+
+    def triangles(self, i):
+        clipped = self.clipped.get(i)
+        if clipped is None:
+            return ((self.screen_verts[self.faces[i]], None),)
+        return clipped
+
+
+# Random faces, every other one with its verts snapped to pixel centers so edges run through pixels
+def _random_frame(count, seed):
+    rng = np.random.default_rng(seed)
+    verts = rng.uniform(-1.2, 1.2, (count * 3, 3))
+    snapped = np.arange(count * 3) // 3 % 2 == 1
+    verts[snapped, 0] = np.round((verts[snapped, 0] + 1) * WIDTH / 2) / (WIDTH / 2) - 1
+    verts[snapped, 2] = np.round((verts[snapped, 2] + 1) * HEIGHT / 2) / (HEIGHT / 2) - 1
+    return _Frame(verts, np.arange(count * 3).reshape(count, 3))
+
+
+def _clipped_frame(count, seed):
+    rng = np.random.default_rng(seed)
+    clip = rng.uniform(-1.5, 1.5, (count * 3, 4))
+    clip[:, 3] = rng.uniform(0.2, 1.5, count * 3)
+    faces = np.arange(count * 3).reshape(count, 3)
+    screen_verts = clip[:, :3] / np.abs(clip[:, 3:])
+    return _Frame(screen_verts, faces, clip_near(clip, faces, range(count)))
+
+
+def _gbuffer(raster, frames, depth_tested, rect):
+    x0, x1, y0, y1 = rect
+    gbuffer = GBuffer(x1 - x0 + 1, y1 - y0 + 1, x0, y0, np.full((WIDTH, HEIGHT), 2.0))
+    draw_list = [(mesh_id, range(len(frame.faces))) for mesh_id, frame in enumerate(frames)]
+    raster(gbuffer, frames, draw_list, depth_tested)
+    return gbuffer
+
+
+def _numpy(gbuffer, frames, draw_list, depth_tested):
+    rasterize(gbuffer, gbuffer.depth, frames, draw_list, WIDTH, HEIGHT, depth_tested, gbuffer.rect())
+
+
+def _jit(gbuffer, frames, draw_list, depth_tested):
+    raster_jit.rasterize(gbuffer, frames, draw_list, WIDTH, HEIGHT, depth_tested)
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("depth_tested", [True, False])
+@pytest.mark.parametrize("rect", [(0, WIDTH - 1, 0, HEIGHT - 1), (5, 30, 8, 25)])
+def test_kernel_matches_numpy_core(seed, depth_tested, rect):
+    frames = [_random_frame(40, seed), _clipped_frame(20, seed)]
+    expected = _gbuffer(_numpy, frames, depth_tested, rect)
+    actual = _gbuffer(_jit, frames, depth_tested, rect)
+    assert np.array_equal(actual.mesh_id, expected.mesh_id)
+    assert np.array_equal(actual.face_id, expected.face_id)
+    assert np.array_equal(actual.bc, expected.bc)
+    assert np.array_equal(actual.depth, expected.depth)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from frustum import clip_near
+from rasterizer import bounding_box, raster_spans, raster_triangle
+
+WIDTH = 48
+HEIGHT = 40
+
+
+# The per pixel coverage test the renderer used before rasterization was vectorized
+def _covered_pixels(verts, width, height):
+    a = np.array([verts[0, 0], verts[0, 2]])
+    b = np.array([verts[1, 0], verts[1, 2]])
+    c = np.array([verts[2, 0], verts[2, 2]])
+    x0, x1, y0, y1 = bounding_box(verts, width, height)
+    pixels = set()
+    for x in range(x0, x1 + 1):
+        for y in range(y0, y1 + 1):
+            p = np.array([2.0 * x / width - 1.0, 2.0 * y / height - 1.0])
+            v0, v1, v2 = b - a, c - a, p - a
+            d00, d01, d11 = np.dot(v0, v0), np.dot(v0, v1), np.dot(v1, v1)
+            d20, d21 = np.dot(v2, v0), np.dot(v2, v1)
+            denom = d00 * d11 - d01 * d01
+            with np.errstate(divide='ignore', invalid='ignore'):
+                v = (d11 * d20 - d01 * d21) / denom
+                w = (d00 * d21 - d01 * d20) / denom
+            u = 1.0 - v - w
+            if 0 <= u <= 1 and 0 <= v <= 1 and 0 <= w <= 1:
+                pixels.add((x, y))
+    return pixels
+
+
+# Random faces, every other one with its verts snapped to pixel centers so edges run through pixels
+def _faces(count, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        verts = rng.uniform(-1.2, 1.2, (3, 3))
+        if i % 2:
+            verts[:, 0] = np.round((verts[:, 0] + 1) * WIDTH / 2) / (WIDTH / 2) - 1
+            verts[:, 2] = np.round((verts[:, 2] + 1) * HEIGHT / 2) / (HEIGHT / 2) - 1
+        yield verts
+
+
+@pytest.mark.parametrize("verts", list(_faces(60)))
+def test_raster_triangle_matches_per_pixel_test(verts):
+    xs, ys, bc, depth = raster_triangle(verts, WIDTH, HEIGHT)
+    assert set(zip(xs.tolist(), ys.tolist())) == _covered_pixels(verts, WIDTH, HEIGHT)
+    assert np.allclose(depth, bc @ verts[:, 1])
+
+
+# Screen space triangles left of random faces crossing the near plane
+def _near_clipped(count, seed=1):
+    rng = np.random.default_rng(seed)
+    clip = rng.uniform(-1.5, 1.5, (count * 3, 4))
+    clip[:, 3] = rng.uniform(0.2, 1.5, count * 3)
+    faces = np.arange(count * 3).reshape(count, 3)
+    for triangles in clip_near(clip, faces, range(count)).values():
+        for verts, bary in triangles:
+            yield verts
+
+
+def _pixels(raster, verts, rect=None):
+    xs, ys, bc, depth = raster(verts, WIDTH, HEIGHT, rect)
+    return {(x, y): (tuple(b), d) for x, y, b, d in zip(xs.tolist(), ys.tolist(), bc.tolist(), depth.tolist())}
+
+
+@pytest.mark.parametrize("verts", list(_faces(60, seed=2)) + list(_near_clipped(30)))
+@pytest.mark.parametrize("rect", [None, (5, 30, 8, 25)])
+def test_raster_spans_matches_raster_triangle(verts, rect):
+    assert _pixels(raster_spans, verts, rect) == _pixels(raster_triangle, verts, rect)
+
+
+def test_raster_spans_flat_face():
+    verts = np.array([[-0.5, 0.0, 0.1], [0.5, 0.2, 0.1], [0.0, 0.1, 0.1]])
+    assert _pixels(raster_spans, verts) == _pixels(raster_triangle, verts)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from renderer import RenderAlgorithm
+
+BG = [80, 80, 80]
+AMBIENT = [0.4, 0.4, 0.4]
+
+
+def _frame(renderer, time=0.7, algorithm=RenderAlgorithm.PHONG, **size):
+    return renderer.render_frame(algorithm, BG, AMBIENT, time, **size).copy()
+
+
+# Each change to the static part of the scene must show up in the next frame, as it does without caching
+@pytest.mark.parametrize("change", [
+    lambda r: setattr(r.meshs[1], "diffuse_color", np.array([1.0, 0.0, 0.0])),
+    lambda r: setattr(r.meshs[1], "ka", 0.5),
+    lambda r: setattr(r.light, "intensity", 20.0),
+    lambda r: setattr(r.light, "color", np.array([1.0, 0.5, 0.5])),
+    lambda r: setattr(r.meshs[1].transform, "x_pos", 0.3),
+    lambda r: setattr(r.meshs[1], "geometry", r.meshs[0].geometry),
+])
+def test_static_layer_follows_changes(scene, change):
+    cached = scene()
+    _frame(cached)
+    change(cached)
+    uncached = scene(static_caching=False)
+    change(uncached)
+    assert np.array_equal(_frame(cached, 0.9), _frame(uncached, 0.9))
+
+
+def test_static_layer_per_size(scene):
+    renderer = scene()
+    _frame(renderer)
+    layer = renderer._static_layers[(48, 40)][1]
+    _frame(renderer, width=24, height=20)
+    _frame(renderer, 0.9)
+    assert renderer._static_layers[(48, 40)][1] is layer
+    assert set(renderer._static_layers) == {(48, 40), (24, 20)}
@@ -0,0 +1,22 @@
+import numpy as np
+import animation_curve as curve
+from transform import Transform
+
+
+def test_direct_assignment_replaces_cached_matrix():
+    transform = Transform()
+    transform.set_position(1.0, 2.0, 3.0)
+    assert transform.transformation_matrix(0.5)[0, 3] == 1.0
+    transform.x_pos = 5.0
+    assert transform.transformation_matrix(0.5)[0, 3] == 5.0
+    transform.z_rot = 90.0
+    assert np.allclose(transform.transformation_matrix(1.0)[:3, :3], [[0, -1, 0], [1, 0, 0], [0, 0, 1]])
+
+
+def test_animated_component_follows_time():
+    transform = Transform()
+    transform.transformation_matrix(0.0)
+    transform.y_pos = curve.Curve([[0.0, 0.0, curve.CurveType.LINEAR, 2], [2.0, 1.0, curve.CurveType.HOLD, 2]])
+    assert not transform.is_static()
+    assert transform.transformation_matrix(0.0)[1, 3] == 0.0
+    assert transform.transformation_matrix(1.0)[1, 3] == 2.0
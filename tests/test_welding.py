@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+import stl
+import stl_stream
+import welding
+from welding import ChunkedWeld
+
+CHUNK_FACES = 7000
+
+
+# A triangle soup of a shuffled, slightly bumpy grid, large enough for ChunkedWeld to merge several times
+def _soup(size=260, seed=0):
+    rng = np.random.default_rng(seed)
+    x, y = np.meshgrid(np.arange(size + 1), np.arange(size + 1), indexing='ij')
+    grid = np.stack((x * 0.1, y * 0.1, rng.uniform(0, 0.02, x.shape)), axis=-1)
+    corners = grid[:-1, :-1], grid[1:, :-1], grid[1:, 1:], grid[:-1, 1:]
+    faces = np.concatenate([np.stack((corners[0], corners[1], corners[2]), axis=2).reshape(-1, 3, 3),
+                            np.stack((corners[0], corners[2], corners[3]), axis=2).reshape(-1, 3, 3)])
+    # Corners of every other face are a little off, only merged with a tolerance
+    faces[::2] += rng.uniform(0, 1e-4, faces[::2].shape)
+    return faces[rng.permutation(len(faces))]
+
+
+def _chunked_weld(points, tolerance):
+    weld = ChunkedWeld(tolerance)
+    chunks = [weld.add(points[start:start + CHUNK_FACES]) for start in range(0, len(points), CHUNK_FACES)]
+    verts = weld.finish()
+    return verts, np.concatenate([weld.renumber(i, faces) for i, faces in enumerate(chunks)])
+
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.05])
+def test_chunked_weld_matches_weld(tolerance):
+    points = _soup()
+    verts, faces = welding.weld(points, tolerance)
+    chunked_verts, chunked_faces = _chunked_weld(points, tolerance)
+    assert np.array_equal(chunked_verts, verts)
+    assert np.array_equal(chunked_faces, faces)
+    assert len(verts) > 1 << 16
+
+
+def test_tolerance_merges_close_points():
+    points = _soup(size=20)
+    assert len(welding.weld(points, 0.05)[0]) < len(welding.weld(points)[0])
+
+
+def test_weld_merges_equal_points():
+    points = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]], dtype=float)
+    verts, faces = welding.weld(points)
+    assert np.array_equal(verts, points[[0, 1, 2, 4]])
+    assert np.array_equal(faces, [[0, 1, 2], [1, 3, 2]])
+
+
+# numpy-stl and weld on the whole file, as Geometry reads ASCII STLs
+def _reference(stl_path, tolerance):
+    mesh = stl.mesh.Mesh.from_file(stl_path)
+    verts, faces = welding.weld(mesh.vectors, tolerance)
+    return (verts, faces, mesh.normals, welding.vertex_normals(faces, mesh.normals, len(verts)),
+            (tuple(mesh.min_), tuple(mesh.max_)))
+
+
+@pytest.mark.parametrize("tolerance", [0.0, 0.05])
+def test_stl_stream_load_matches_numpy_stl(tmp_path, tolerance):
+    soup = _soup(size=80)
+    mesh = stl.mesh.Mesh(np.zeros(len(soup), dtype=stl.mesh.Mesh.dtype))
+    mesh.vectors[:] = soup
+    stl_path = str(tmp_path / "grid.stl")
+    mesh.save(stl_path, mode=stl.Mode.BINARY)
+    assert stl_stream.is_binary(stl_path)
+
+    expected = _reference(stl_path, tolerance)
+    loaded = stl_stream.load(stl_path, tolerance, chunk_triangles=CHUNK_FACES)
+    for array, expected_array in zip(loaded[:3], expected[:3]):
+        assert np.array_equal(array, expected_array)
+    assert np.allclose(loaded[3], expected[3], atol=1e-12)
+    assert loaded[4] == expected[4]
+
+
+def test_stl_stream_ascii_and_empty(tmp_path):
+    ascii_path = tmp_path / "face.stl"
+    ascii_path.write_text("solid face\nfacet normal 0 0 1\nouter loop\nvertex 0 0 0\nvertex 1 0 0\nvertex 0 1 0\n"
+                          "endloop\nendfacet\nendsolid face\n")
+    assert not stl_stream.is_binary(str(ascii_path))
+
+    empty_path = tmp_path / "empty.stl"
+    empty_path.write_bytes(bytes(80) + np.uint32(0).tobytes())
+    assert stl_stream.is_binary(str(empty_path))
+    verts, faces, normals, vertex_normals, bounds = stl_stream.load(str(empty_path))
+    assert verts.shape == (0, 3) and faces.shape == (0, 3) and bounds == ()
@@ -0,0 +1,196 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import pickle
+import weakref
+import numpy as np
+from gbuffer import GBuffer
+from occlusion import front_to_back, HierarchicalZ
+from rasterizer import bounding_boxes
+
+
+# Renders a frame as independent square tiles in a pool of worker processes.
+# Faces are binned by their display bounding box, then every worker rasterizes and shades one tile at a time
+# straight into a framebuffer and z-buffer in shared memory. Tiles never overlap, so no locking is needed.
+# The frame's meshes and shader are pickled once into shared memory as well, every worker unpickles them once
+# per frame, and a tile task only carries its rect and face ids.
+# The shared buffers are kept from frame to frame, see framebuffer.FrameBuffers for the dtypes.
+class TileRenderer:
+    def __init__(self, workers, tile_size=64, color_dtype=np.uint8, depth_dtype=np.float64):
+        if workers < 1 or tile_size < 1:
+            raise ValueError("Workers or tile size is 0 or less!")
+        self.workers = workers
+        self.tile_size = tile_size
+        self.color_dtype = np.dtype(color_dtype)
+        self.depth_dtype = np.dtype(depth_dtype)
+        self._pool = None
+        self._shared = None
+
+    # Renders face_ids[i] of every TransformedMesh frames[i] with a prepared shading.Shader and returns the
+    # (width, height, 3) frame. The frames and shader are pickled to the workers.
+    # occlusion_culling: workers draw their faces front to back and skip the ones a HierarchicalZ hides
+    # scanline: workers rasterize with the scanline engine, see rasterizer.rasterize
+    # jit: workers rasterize with the compiled kernel if Numba is installed, see raster_jit
+    # layer: a (color, depth) pair the frame starts from instead of bg_color, see framebuffer.FrameBuffers.clear
+    def render(self, frames, face_ids, shader, bg_color, width, height, occlusion_culling=False, scanline=False,
+               jit=False, layer=None):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        color_shm, depth_shm = self._shared_memory(width, height)
+        render = np.ndarray((width, height, 3), dtype=self.color_dtype, buffer=color_shm.buf)
+        z_buffer = np.ndarray((width, height), dtype=self.depth_dtype, buffer=depth_shm.buf)
+        scene_shm = _share_bytes(pickle.dumps((frames, shader), protocol=pickle.HIGHEST_PROTOCOL))
+        try:
+            if layer is None:
+                render[...] = bg_color
+                z_buffer.fill(2.0)
+            else:
+                render[...] = layer[0]
+                z_buffer[...] = layer[1]
+
+            shared = (color_shm.name, depth_shm.name, self.color_dtype, self.depth_dtype, width, height,
+                      scene_shm[0].name, scene_shm[1])
+            tasks = []
+            for rect, tile_face_ids in bin_faces(frames, face_ids, width, height, self.tile_size):
+                tasks.append(self._pool.submit(_render_tile, shared, rect, tile_face_ids, occlusion_culling,
+                                               scanline, jit))
+            for task in tasks:
+                task.result()
+
+            frame = render.copy()
+        finally:
+            del render, z_buffer
+            _unlink(scene_shm[0])
+        return frame
+
+    # Returns a copy of the z-buffer the last frame of this size was rendered with, or None if there is none
+    def depth(self, width, height):
+        if self._shared is None or self._shared[0] != (width, height):
+            return None
+        z_buffer = np.ndarray((width, height), dtype=self.depth_dtype, buffer=self._shared[1][1].buf)
+        try:
+            return z_buffer.copy()
+        finally:
+            del z_buffer
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self._release_shared_memory()
+
+    # The pool and shared memory can't be pickled, a copy starts its own when it first renders
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_shared'] = None
+        return state
+
+    # Returns the shared (color, depth) memory for a frame of this size, replacing the last one if the size changed.
+    # It is also released when the TileRenderer is garbage collected without being closed.
+    def _shared_memory(self, width, height):
+        if self._shared is not None and self._shared[0] == (width, height):
+            return self._shared[1]
+        self._release_shared_memory()
+        color_shm = shared_memory.SharedMemory(create=True, size=width * height * 3 * self.color_dtype.itemsize)
+        depth_shm = shared_memory.SharedMemory(create=True, size=width * height * self.depth_dtype.itemsize)
+        self._shared = ((width, height), (color_shm, depth_shm), weakref.finalize(self, _unlink, color_shm, depth_shm))
+        return color_shm, depth_shm
+
+    def _release_shared_memory(self):
+        if self._shared is None:
+            return
+        self._shared[2]()
+        self._shared = None
+
+
+def _unlink(*shms):
+    for shm in shms:
+        shm.close()
+        shm.unlink()
+
+
+# Copies data into new shared memory, returns (shared memory, length of data)
+def _share_bytes(data):
+    shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    shm.buf[:len(data)] = data
+    return shm, len(data)
+
+
+# Splits the display into tiles and returns (rect, face_ids) for every tile at least one face touches.
+# rect is (x0, x1, y0, y1) inclusive, face_ids holds the faces of each mesh overlapping the tile, in draw order.
+def bin_faces(frames, face_ids, width, height, tile_size):
+    bins = {}
+    for mesh_id, (frame, ids) in enumerate(zip(frames, face_ids)):
+        ids = np.asarray(ids, dtype=int)
+        if len(ids) == 0:
+            continue
+        low, high = frame.screen_bounds(ids)
+        x0, x1, y0, y1 = bounding_boxes(low, high, width, height)
+        tx0, tx1 = x0 // tile_size, x1 // tile_size
+        ty0, ty1 = y0 // tile_size, y1 // tile_size
+        for tx in range(tx0.min(), tx1.max() + 1):
+            in_column = (tx0 <= tx) & (tx <= tx1)
+            for ty in range(ty0.min(), ty1.max() + 1):
+                in_tile = in_column & (ty0 <= ty) & (ty <= ty1)
+                if not in_tile.any():
+                    continue
+                if (tx, ty) not in bins:
+                    bins[(tx, ty)] = [np.zeros(0, dtype=int) for _ in frames]
+                bins[(tx, ty)][mesh_id] = ids[in_tile]
+
+    tiles = []
+    for (tx, ty), tile_face_ids in sorted(bins.items()):
+        rect = (tx * tile_size, min(width, (tx + 1) * tile_size) - 1,
+                ty * tile_size, min(height, (ty + 1) * tile_size) - 1)
+        tiles.append((rect, tile_face_ids))
+    return tiles
+
+
+# The (shared memory name, frames, shader) of the frame a worker last rendered tiles of
+_worker_scene = None
+
+
+# Worker side of TileRenderer.render, attaches to the shared buffers and renders one tile
+def _render_tile(shared, rect, face_ids, occlusion_culling, scanline, jit):
+    color_name, depth_name, color_dtype, depth_dtype, width, height, scene_name, scene_size = shared
+    frames, shader = _scene(scene_name, scene_size)
+    color_shm = shared_memory.SharedMemory(name=color_name)
+    depth_shm = shared_memory.SharedMemory(name=depth_name)
+    try:
+        _shade_tile(color_shm, depth_shm, color_dtype, depth_dtype, width, height, rect, frames, face_ids, shader,
+                    occlusion_culling, scanline, jit)
+    finally:
+        color_shm.close()
+        depth_shm.close()
+
+
+# Returns the (frames, shader) of a frame, unpickled from its shared memory by the first tile of it in this worker
+def _scene(name, size):
+    global _worker_scene
+    if _worker_scene is None or _worker_scene[0] != name:
+        # Dropped first, so the last frame's meshes aren't held twice
+        _worker_scene = None
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            data = bytes(shm.buf[:size])
+        finally:
+            shm.close()
+        _worker_scene = (name,) + pickle.loads(data)
+    return _worker_scene[1:]
+
+
+# Kept separate from _render_tile so every view into shared memory is released before it is closed
+def _shade_tile(color_shm, depth_shm, color_dtype, depth_dtype, width, height, rect, frames, face_ids, shader,
+                occlusion_culling, scanline, jit):
+    render = np.ndarray((width, height, 3), dtype=color_dtype, buffer=color_shm.buf)
+    z_buffer = np.ndarray((width, height), dtype=depth_dtype, buffer=depth_shm.buf)
+    x0, x1, y0, y1 = rect
+    gbuffer = GBuffer(x1 - x0 + 1, y1 - y0 + 1, x0, y0, depth=z_buffer)
+    if occlusion_culling and shader.depth_tested:
+        gbuffer.rasterize(frames, front_to_back(frames, face_ids), width, height, True, HierarchicalZ(z_buffer, rect),
+                          scanline, jit)
+    else:
+        gbuffer.rasterize(frames, list(enumerate(face_ids)), width, height, shader.depth_tested, scanline=scanline,
+                          jit=jit)
+    gbuffer.resolve(render, frames, shader)
@@ -23,6 +23,7 @@ class Transform:
     def __init__(self):
         self.last_interp = None
         self.last_tf_mat = None
+        self.last_components = None
 
         self.x_pos = 0.0
         self.y_pos = 0.0
@@ -32,8 +33,11 @@ class Transform:
         self.y_rot = 0.0
         self.z_rot = 0.0
 
+    # The last matrix is reused while no component was replaced, for any interpolation if none is animated
     def transformation_matrix(self, interpolation=0.0):
-        if self.last_interp == interpolation:
+        components = (self.x_pos, self.y_pos, self.z_pos, self.x_rot, self.y_rot, self.z_rot)
+        if self.last_tf_mat is not None and self.last_components == components and \
+                (self.last_interp == interpolation or self.is_static()):
             return self.last_tf_mat
 
         tf_matrix = np.identity(4, dtype=float)
@@ -54,6 +58,7 @@ class Transform:
 
         self.last_interp = interpolation
         self.last_tf_mat = tf_matrix
+        self.last_components = components
         return tf_matrix
 
     def set_position(self, x, y, z):
@@ -66,6 +71,12 @@ class Transform:
         self.y_rot = y
         self.z_rot = z
 
+    # True if no position or rotation component is an animation_curve.Curve, the transform is then the same
+    # at every time
+    def is_static(self):
+        return not any(type(v) == curve.Curve
+                       for v in (self.x_pos, self.y_pos, self.z_pos, self.x_rot, self.y_rot, self.z_rot))
+
     def inverse_matrix(self, interpolation):  # =0.0):
         ret = np.identity(4, dtype=float)
         tf_mat = self.transformation_matrix(interpolation)
@@ -84,3 +95,12 @@ class Transform:
 
     def apply_to_normal(self, n, interpolation):  # =0.0):
         return np.matmul(self.transformation_matrix(interpolation)[:3, :3], np.array(n).T)
+
+    # Batched versions of the above, points and normals are (N, 3) arrays
+    def apply_to_points(self, points, interpolation):
+        tf_mat = self.transformation_matrix(interpolation)
+        return np.matmul(np.asarray(points, dtype=float).reshape(-1, 3), tf_mat[:3, :3].T) + tf_mat[:3, 3]
+
+    def apply_to_normals(self, normals, interpolation):
+        tf_mat = self.transformation_matrix(interpolation)
+        return np.matmul(np.asarray(normals, dtype=float).reshape(-1, 3), tf_mat[:3, :3].T)
@@ -0,0 +1,100 @@
+import numpy as np
+import frustum
+from shading import normalize_rows
+
+
+# Per-frame vertex data for a whole mesh.
+# Vertices and normals are transformed once per frame as (N, 3) arrays, the rasterizer then indexes them by face.
+# world is an earlier TransformedMesh of the mesh with the same model matrix, its world space arrays are reused,
+# or the world space arrays already transformed by transform_instances, like clip_verts.
+class TransformedMesh:
+    def __init__(self, mesh, camera, time, world=None, clip_verts=None):
+        model = mesh.transform.transformation_matrix(time)
+
+        self.mesh = mesh
+        self.geometry = mesh.geometry
+        self.model_matrix = model
+        self.view_projection = camera.view_projection_matrix()
+        self.faces = np.asarray(mesh.faces, dtype=int).reshape(-1, 3)
+
+        # World space
+        if world is not None:
+            self.world_verts, self.vertex_normals, self.face_normals = \
+                world.world_verts, world.vertex_normals, world.face_normals
+        else:
+            self.world_verts = mesh.transform.apply_to_points(mesh.verts, time)
+            self.vertex_normals = mesh.transform.apply_to_normals(mesh.vertex_normals, time)
+            self.face_normals = mesh.transform.apply_to_normals(normalize_rows(mesh.normals), time)
+
+        # Clip and screen space, model-view-projection as one matrix
+        self.clip_verts = camera.clip_points(mesh.verts, model) if clip_verts is None else clip_verts
+        self.screen_verts = frustum.to_screen(self.clip_verts)
+
+        # Faces entirely outside the view volume are never rasterized,
+        # faces crossing the near plane are rasterized as the triangles left in front of it
+        distances = frustum.plane_distances(self.clip_verts)
+        self.outside = frustum.faces_outside(distances, self.faces)
+        crossing = ~self.outside & (distances[self.faces, frustum.NEAR] < 0).any(axis=1)
+        self.clipped = frustum.clip_near(self.clip_verts, self.faces, np.flatnonzero(crossing))
+
+    # Returns the screen space triangles to rasterize for face i as (verts, bary) pairs.
+    # bary maps barycentric coordinates in the triangle to ones in the face, None if the triangle is the face.
+    def triangles(self, i):
+        clipped = self.clipped.get(i)
+        if clipped is None:
+            return ((self.screen_verts[self.faces[i]], None),)
+        return clipped
+
+    # Returns the screen space (low, high) corners of the bounds of faces ids, (n, 3) each
+    def screen_bounds(self, ids):
+        ids = np.asarray(ids, dtype=int)
+        face_verts = self.screen_verts[self.faces[ids]]
+        low = face_verts.min(axis=1)
+        high = face_verts.max(axis=1)
+        if self.clipped:
+            for i in np.flatnonzero(np.isin(ids, list(self.clipped))):
+                verts = np.concatenate([verts for verts, bary in self.clipped[ids[i]]])
+                low[i] = verts.min(axis=0)
+                high[i] = verts.max(axis=0)
+        return low, high
+
+    # Returns a mask of faces pointing away from view_dir
+    def backfaces(self, view_dir):
+        return np.matmul(self.face_normals, view_dir) > 0
+
+
+# TransformedMeshs of meshs sharing one geometry. Each space is transformed for all of them at once,
+# with one product of the geometry's arrays and the matrices of every instance side by side.
+def transform_instances(meshs, camera, time):
+    if len(meshs) == 1:
+        return [TransformedMesh(meshs[0], camera, time)]
+    geometry = meshs[0].geometry
+    models = [mesh.transform.transformation_matrix(time) for mesh in meshs]
+    view_projection = camera.view_projection_matrix()
+
+    world_verts = _apply_all(geometry.verts, models)
+    vertex_normals = _apply_all(geometry.vertex_normals, models, translate=False)
+    face_normals = _apply_all(normalize_rows(geometry.normals), models, translate=False)
+    clip_verts = _apply_all(geometry.verts, [np.matmul(view_projection, model) for model in models], rows=4)
+    return [TransformedMesh(mesh, camera, time, _WorldSpace(world_verts[i], vertex_normals[i], face_normals[i]),
+                            clip_verts[i])
+            for i, mesh in enumerate(meshs)]
+
+
+# World space arrays of a mesh, see TransformedMesh
+class _WorldSpace:
+    def __init__(self, world_verts, vertex_normals, face_normals):
+        self.world_verts = world_verts
+        self.vertex_normals = vertex_normals
+        self.face_normals = face_normals
+
+
+# Applies the first rows rows of every (4, 4) matrix to the (N, 3) points, like Transform.apply_to_points and
+# camera.clip_points do for one. Returns (matrices, N, rows).
+def _apply_all(points, matrices, rows=3, translate=True):
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    linear = np.concatenate([matrix[:rows, :3].T for matrix in matrices], axis=1)
+    applied = np.matmul(points, linear).reshape(len(points), len(matrices), rows)
+    if translate:
+        applied = applied + np.array([matrix[:rows, 3] for matrix in matrices])
+    return np.ascontiguousarray(applied.transpose(1, 0, 2))
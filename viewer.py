@@ -0,0 +1,74 @@
+import math
+import numpy as np
+import pygame
+
+
+# Interactive preview of a Renderer's scene on its Screen.
+# Every frame is first rendered at 1/scales[0] of the screen's resolution and upsampled, then refined through
+# the other scales up to full resolution for as long as no input arrives. Once refined it waits on events,
+# so an idle viewer uses no CPU.
+# Left and right arrow keys step animation time by one frame at fps, home and end jump to the start and end,
+# clicking or dragging across the window scrubs through time from 0 to duration. Escape or closing the window quits.
+class Viewer:
+    def __init__(self, renderer, render_algorithm, bg_color, ambient_light, duration, fps=8, scales=(8, 4, 2, 1)):
+        if len(scales) == 0 or min(scales) < 1:
+            raise ValueError("Scales are empty or less than 1!")
+        self.renderer = renderer
+        self.render_algorithm = render_algorithm
+        self.bg_color = bg_color
+        self.ambient_light = ambient_light
+        self.duration = duration
+        self.fps = fps
+        self.scales = scales
+        self.time = 0.0
+
+    # Runs the viewer until it is closed, starting at time
+    def show(self, time=0.0):
+        self.time = min(max(time, 0.0), self.duration)
+        level = 0
+        running = True
+        while running:
+            if level < len(self.scales):
+                self._draw(self.scales[level])
+                level += 1
+                events = pygame.event.get()
+            else:
+                events = [pygame.event.wait()]
+
+            # Only the last of a burst of scrubbing events matters, the frame restarts coarse for it
+            new_time = self.time
+            for event in events:
+                if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                    running = False
+                new_time = self._scrub(event, new_time)
+            if new_time != self.time:
+                self.time = new_time
+                level = 0
+        pygame.quit()
+
+    # Renders the frame at 1/scale of the screen's resolution and draws it upsampled to full size
+    def _draw(self, scale):
+        screen = self.renderer.screen
+        width, height = math.ceil(screen.width / scale), math.ceil(screen.height / scale)
+        frame = self.renderer.render_frame(self.render_algorithm, self.bg_color, self.ambient_light, self.time,
+                                           width, height)
+        if scale > 1:
+            frame = np.repeat(np.repeat(frame, scale, axis=0), scale, axis=1)[:screen.width, :screen.height]
+        screen.draw(frame)
+        pygame.display.set_caption(f"t = {self.time:.3f}s" + (f" (1/{scale})" if scale > 1 else ""))
+
+    # Returns the animation time an event moves to from time
+    def _scrub(self, event, time):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_RIGHT:
+                time += 1 / self.fps
+            elif event.key == pygame.K_LEFT:
+                time -= 1 / self.fps
+            elif event.key == pygame.K_HOME:
+                time = 0.0
+            elif event.key == pygame.K_END:
+                time = self.duration
+        elif (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1) or \
+                (event.type == pygame.MOUSEMOTION and event.buttons[0]):
+            time = event.pos[0] / max(self.renderer.screen.width - 1, 1) * self.duration
+        return min(max(time, 0.0), self.duration)
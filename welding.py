@@ -0,0 +1,115 @@
+import numpy as np
+
+
+# Merges the duplicate corners of a triangle soup into shared vertices.
+# points are (n, 3), every three of them a face. Without a tolerance only equal points are merged,
+# with one every point is snapped to a grid of tolerance sized cells and the points in a cell are merged.
+# Returns (verts, faces): the (V, 3) float merged points in order of first appearance, each at its first point,
+# and the (n // 3, 3) int faces indexing them.
+def weld(points, tolerance=0.0):
+    points = np.asarray(points).reshape(-1, 3)
+    _, first, inverse = np.unique(_keys(points, tolerance), return_index=True, return_inverse=True)
+
+    # np.unique numbers the vertices in sorted order, renumber them by first appearance
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return points[first[order]].astype(float), rank[inverse.ravel()].reshape(-1, 3)
+
+
+# Normalized vertex normals of a welded mesh: the sum of face_normals over the faces around each vertex.
+# STL normals are scaled by face area, which weights the sum by area.
+# Summed over chunk faces at a time to bound the memory used for large meshes.
+def vertex_normals(faces, face_normals, vertex_count, chunk=1 << 18):
+    sums = np.zeros((vertex_count, 3))
+    for start in range(0, len(faces), chunk):
+        sums += _normal_sums(faces[start:start + chunk], face_normals[start:start + chunk], vertex_count)
+    n = np.linalg.norm(sums, axis=1)
+    n[n == 0] = 1.0
+    return sums / n[:, np.newaxis]
+
+
+# weld for a triangle soup too large to hold at once, added in chunks of whole faces.
+# Only the merged vertices and one chunk of points are in memory:
+# add returns the faces of a chunk numbered within the chunk, after the last chunk finish returns the verts,
+# and renumber turns a chunk's faces into indices of the verts, like weld would return them.
+class ChunkedWeld:
+    def __init__(self, tolerance=0.0):
+        self.tolerance = tolerance
+        self._count = 0
+        # Merged so far, sorted by key: the keys, the index of their first point and that point
+        self._keys = None
+        self._first = None
+        self._points = None
+        # For every chunk, the merged index of its vertices, None for the pending chunks not merged yet
+        self._maps = []
+        self._pending = []
+        self._pending_count = 0
+        self._rank = None
+
+    def add(self, points):
+        points = np.asarray(points).reshape(-1, 3)
+        keys = _keys(points, self.tolerance)
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        self._pending.append((keys[first], first + self._count, points[first]))
+        self._pending_count += len(first)
+        self._count += len(points)
+        self._maps.append(None)
+        # Merged once the chunks' own vertices outnumber the merged ones, so every vertex is sorted a few times at most
+        if self._pending_count > max(0 if self._keys is None else len(self._keys), 1 << 16):
+            self._merge()
+        return inverse.reshape(-1, 3)
+
+    # Returns the (V, 3) float verts like weld
+    def finish(self):
+        self._merge()
+        order = np.argsort(self._first)
+        self._rank = np.empty_like(order)
+        self._rank[order] = np.arange(len(order))
+        return self._points[order].astype(float)
+
+    # The faces add returned for the i-th chunk as indices of the verts
+    def renumber(self, i, faces):
+        return self._rank[self._maps[i][faces]]
+
+    def _merge(self):
+        if not self._pending:
+            return
+        merged = [] if self._keys is None else [(self._keys, self._first, self._points)]
+        keys, first, points = (np.concatenate(arrays) for arrays in zip(*(merged + self._pending)))
+        # The merged vertices come first and the chunks in order, so the first of equal keys is the earliest point
+        _, unique, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        self._keys, self._first, self._points = keys[unique], first[unique], points[unique]
+
+        merged_count = 0 if not merged else len(merged[0][0])
+        for i, chunk_map in enumerate(self._maps):
+            if chunk_map is not None:
+                self._maps[i] = inverse[chunk_map]
+        offset = merged_count
+        pending = iter(self._pending)
+        for i, chunk_map in enumerate(self._maps):
+            if chunk_map is None:
+                count = len(next(pending)[0])
+                self._maps[i] = inverse[offset:offset + count]
+                offset += count
+        self._pending = []
+        self._pending_count = 0
+
+
+def _normal_sums(faces, face_normals, vertex_count):
+    corners = np.asarray(faces).ravel()
+    face_normals = np.repeat(np.asarray(face_normals, dtype=float), 3, axis=0)
+    return np.stack([np.bincount(corners, face_normals[:, k], vertex_count) for k in range(3)], axis=1)
+
+
+# One hashable key per point, equal for points that get merged. The three coordinates are compared as one
+# block of bytes, which np.unique sorts far faster than rows.
+def _keys(points, tolerance):
+    if tolerance > 0:
+        keys = np.floor(points / tolerance).astype(np.int64)
+    else:
+        # 0.0 and -0.0 are the same point but not the same bytes
+        keys = points + 0.0
+    keys = np.ascontiguousarray(keys)
+    return keys.view(np.dtype((np.void, keys.dtype.itemsize * 3))).ravel()